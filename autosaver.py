@@ -0,0 +1,104 @@
+import os
+import pickle
+import queue
+import threading
+import traceback
+import typing
+
+from quad_grid import QuadGrid
+from save_format import write_binary_save, TEMP_EXTENSION
+from save_index import SaveIndex
+
+
+def write_save_atomically(path: str, quads: QuadGrid, state: typing.Dict[str, typing.Any]):
+    """
+    Write a binary save to the given path. The save is written to a temporary file first, which then replaces the
+    destination, so that a save is never left half-written if the game exits part-way through.
+    :param path: The path of the save file to write.
+    :param quads: The quads of the game's board.
+    :param state: The remaining game state, i.e. the players, heathens, turn, config, and night status.
+    """
+    temp_path = path + TEMP_EXTENSION
+    with open(temp_path, "wb") as save_file:
+        write_binary_save(save_file, quads, state)
+        save_file.flush()
+        os.fsync(save_file.fileno())
+    os.replace(temp_path, path)
+
+
+class Autosaver:
+    """
+    Writes autosaves on a background thread, so that the game doesn't stall while they are written. Each autosave is a
+    snapshot of the game state at the time it was requested, and the oldest autosaves are deleted once written.
+    """
+
+    def __init__(self, saves_dir: str, prefix: str, index: SaveIndex, max_autosaves: int = 3):
+        """
+        Initialise the autosaver and start its writer thread.
+        :param saves_dir: The directory that saves are written to.
+        :param prefix: The prefix that the file names of autosaves begin with.
+        :param index: The index to record the details of each autosave in.
+        :param max_autosaves: The number of autosaves to keep.
+        """
+        self.saves_dir = saves_dir
+        self.prefix = prefix
+        self.index = index
+        self.max_autosaves = max_autosaves
+        self.pending: queue.Queue = queue.Queue()
+        # The thread is a daemon so that it never keeps the game open. Because saves are written atomically, the worst
+        # that can happen if the game exits mid-write is that the latest autosave is lost.
+        self.thread = threading.Thread(target=self.run, name="autosaver", daemon=True)
+        self.thread.start()
+
+    def save(self, path: str, quads: QuadGrid, state: typing.Dict[str, typing.Any]):
+        """
+        Request an autosave of the given state. Returns once the state has been snapshotted, before it is written.
+        :param path: The path of the autosave file to write.
+        :param quads: The quads of the game's board.
+        :param state: The remaining game state, i.e. the players, heathens, turn, config, and night status.
+        """
+        # Pickling takes a consistent copy of the whole state in a few milliseconds, after which the game is free to
+        # carry on modifying it. The more expensive encoding is left to the writer thread.
+        self.pending.put((path, pickle.dumps((quads, state), protocol=pickle.HIGHEST_PROTOCOL)))
+
+    def run(self):
+        """
+        Write requested autosaves, one at a time, for as long as the game is running.
+        """
+        while True:
+            path, snapshot = self.pending.get()
+            try:
+                quads, state = pickle.loads(snapshot)
+                write_save_atomically(path, quads, state)
+                self.index.record(path, state)
+                self.remove_old_autosaves()
+            # Any failure is caught, not just I/O errors, as an exception escaping this loop would end the thread, and
+            # every later autosave would never be written, leaving wait() to block forever.
+            except Exception:  # pylint: disable=broad-except
+                # A failed autosave shouldn't take the game down with it, but it should still be reported, and we also
+                # don't want to leave the temporary file lying around.
+                traceback.print_exc()
+                try:
+                    if os.path.exists(path + TEMP_EXTENSION):
+                        os.remove(path + TEMP_EXTENSION)
+                except OSError:
+                    traceback.print_exc()
+            finally:
+                self.pending.task_done()
+
+    def remove_old_autosaves(self):
+        """
+        Delete the oldest autosaves, leaving only the most recent ones.
+        """
+        # Autosave file names contain their timestamp, so they sort oldest first.
+        autosaves = sorted(file_name for file_name in os.listdir(self.saves_dir)
+                           if file_name.startswith(self.prefix) and not file_name.endswith(TEMP_EXTENSION))
+        for file_name in autosaves[:-self.max_autosaves]:
+            os.remove(os.path.join(self.saves_dir, file_name))
+        self.index.remove(autosaves[:-self.max_autosaves])
+
+    def wait(self):
+        """
+        Wait for any requested autosaves to be written.
+        """
+        self.pending.join()
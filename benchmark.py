@@ -0,0 +1,242 @@
+import argparse
+import copy
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import typing
+
+from autosaver import write_save_atomically
+from calculator import get_setl_totals, get_player_totals, generate_quads
+from models import GameConfig, Faction, BenchmarkResult
+from simulation import Simulation, load_simulation
+from state_generator import generate_state
+
+# The turn that the game is played to for each stage of the game that the rules are benchmarked at.
+STAGES: typing.Dict[str, int] = {"early": 10, "mid": 60, "late": 140}
+# The number of players in each benchmarked game.
+PLAYER_COUNT = 6
+# The number of players, settlements and units per player, and heathens in the generated stress state.
+STRESS_PLAYERS = 14
+STRESS_SETTLEMENTS = 40
+STRESS_UNITS = 100
+STRESS_HEATHENS = 1000
+# The version of the baseline file's layout.
+BASELINE_VERSION = 1
+# A single benchmark: its name, and a function that performs any untimed setup and returns the function to time.
+Benchmark = typing.Tuple[str, typing.Callable[[], typing.Callable[[], typing.Any]]]
+
+
+def build_state(seed: int, turn: int) -> Simulation:
+    """
+    Build a game state to benchmark against by playing out an AI-only game from the given seed.
+    :param seed: The seed for the game. The same seed will always produce the same state.
+    :param turn: The turn to play the game to. If the game ends before this turn, the state at its end is used.
+    :return: The simulation of the game at the given turn.
+    """
+    sim = Simulation(GameConfig(PLAYER_COUNT, Faction.AGRICULTURISTS, True, True, True, seed))
+    sim.gen_players(ai_only=True)
+    sim.initialise_ais()
+    while sim.turn < turn and sim.step():
+        pass
+    return sim
+
+
+def clear_totals_caches(sim: Simulation):
+    """
+    Clear the cached totals of every settlement in the given game, so that the next calls of get_setl_totals() have to
+    recalculate them.
+    :param sim: The game to clear the caches of.
+    """
+    for player in sim.players:
+        for setl in player.settlements:
+            setl.totals_cache.clear()
+
+
+def plan_stage_benchmarks(stage: str, sim: Simulation, saves_dir: str) -> typing.List[Benchmark]:
+    """
+    Plan the benchmarks to run against the game state for the given stage of the game. Benchmarks that change the state
+    are run against a fresh copy of it each time.
+    :param stage: The name of the stage, e.g. "early".
+    :param sim: The game state for the stage.
+    :param saves_dir: The directory to write benchmarked saves to.
+    :return: The benchmarks for the stage.
+    """
+    save_path = os.path.join(saves_dir, f"{stage}.sav")
+    is_night = sim.nighttime_left > 0
+
+    def setl_totals():
+        clear_totals_caches(sim)
+        return lambda: [get_setl_totals(player, setl, is_night)
+                        for player in sim.players for setl in player.settlements]
+
+    def player_totals():
+        clear_totals_caches(sim)
+        return lambda: [get_player_totals(player, is_night) for player in sim.players]
+
+    def make_moves():
+        sim_copy = copy.deepcopy(sim)
+        return lambda: [sim_copy.move_maker.make_move(player, sim_copy.players, sim_copy.quads, sim_copy.game_config,
+                                                      is_night, sim_copy.rngs) for player in sim_copy.players]
+
+    def process_heathens():
+        return copy.deepcopy(sim).process_heathens
+
+    def check_for_victory():
+        return copy.deepcopy(sim).check_for_victory
+
+    def save_game():
+        return lambda: write_save_atomically(save_path, sim.quads, sim.get_save_state())
+
+    def load_game():
+        if not os.path.exists(save_path):
+            write_save_atomically(save_path, sim.quads, sim.get_save_state())
+
+        def load():
+            with open(save_path, "rb") as save_file:
+                return load_simulation(save_file)
+
+        return load
+
+    return [(f"get_setl_totals[{stage}]", setl_totals),
+            (f"get_player_totals[{stage}]", player_totals),
+            (f"make_move[{stage}]", make_moves),
+            (f"process_heathens[{stage}]", process_heathens),
+            (f"check_for_victory[{stage}]", check_for_victory),
+            (f"save_game[{stage}]", save_game),
+            (f"load_game[{stage}]", load_game)]
+
+
+def run_benchmark(benchmark: Benchmark, repeats: int) -> BenchmarkResult:
+    """
+    Run the given benchmark the given number of times.
+    :param benchmark: The benchmark to run.
+    :param repeats: The number of times to run it.
+    :return: The timings of each run.
+    """
+    name, prepare = benchmark
+    times = []
+    for _ in range(repeats):
+        timed = prepare()
+        # As with timeit, garbage collection is disabled while timing, so that collections of garbage left behind by
+        # earlier benchmarks aren't counted against this one.
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            timed()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return BenchmarkResult(name, times)
+
+
+def run_suite(seed: int, repeats: int, name_filter: typing.Optional[str] = None,
+              stress: bool = False) -> typing.List[BenchmarkResult]:
+    """
+    Run every benchmark in the suite.
+    :param seed: The seed used to generate the map and to build the state for each stage of the game.
+    :param repeats: The number of times to run each benchmark.
+    :param name_filter: If supplied, only the benchmarks whose names contain this are run.
+    :param stress: Whether to also run the benchmarks against a generated state far larger than those reached in play.
+    :return: The timings of each benchmark.
+    """
+    with tempfile.TemporaryDirectory() as saves_dir:
+        benchmarks: typing.List[Benchmark] = \
+            [("generate_quads", lambda: lambda: generate_quads(True, random.Random(seed)))]
+        for stage, turn in STAGES.items():
+            benchmarks.extend(plan_stage_benchmarks(stage, build_state(seed, turn), saves_dir))
+        if stress:
+            stress_state = generate_state(STRESS_PLAYERS, STRESS_SETTLEMENTS, STRESS_UNITS, STRESS_HEATHENS, seed=seed)
+            benchmarks.extend(plan_stage_benchmarks("stress", stress_state, saves_dir))
+        return [run_benchmark(benchmark, repeats) for benchmark in benchmarks
+                if name_filter is None or name_filter in benchmark[0]]
+
+
+def write_baseline(results: typing.List[BenchmarkResult], path: str):
+    """
+    Write the best time of each benchmark to a baseline file, for later runs to be compared against.
+    :param results: The timings of each benchmark.
+    :param path: The path of the baseline file to write.
+    """
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump({"version": BASELINE_VERSION, "benchmarks": {res.name: min(res.times) for res in results}},
+                  baseline_file, indent=2)
+
+
+def read_baseline(path: str) -> typing.Dict[str, float]:
+    """
+    Read the best time of each benchmark from a baseline file.
+    :param path: The path of the baseline file.
+    :return: The best time of each benchmark in the baseline, in seconds, keyed by name.
+    """
+    with open(path, "r", encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"Baseline {path} is from an incompatible version of the benchmark suite.")
+    return baseline["benchmarks"]
+
+
+def print_results(results: typing.List[BenchmarkResult], baseline: typing.Optional[typing.Dict[str, float]],
+                  threshold: float) -> typing.List[str]:
+    """
+    Print the timings of each benchmark, compared against the baseline if one is supplied.
+    :param results: The timings of each benchmark.
+    :param baseline: The best time of each benchmark in the baseline, if comparing against one.
+    :param threshold: The proportion by which a benchmark must be slower than its baseline to count as a regression.
+    :return: The names of the benchmarks that have regressed.
+    """
+    regressions = []
+    header = f"{'Benchmark':<30}{'Best (ms)':>12}{'Median (ms)':>14}"
+    print(header if baseline is None else f"{header}{'Baseline (ms)':>16}{'Change':>10}")
+    for res in results:
+        best = min(res.times)
+        line = f"{res.name:<30}{best * 1000:>12.3f}{statistics.median(res.times) * 1000:>14.3f}"
+        if baseline is not None and res.name in baseline:
+            change = best / baseline[res.name] - 1
+            line += f"{baseline[res.name] * 1000:>16.3f}{change:>+10.1%}"
+            # Benchmarks are compared on their best times, as these are the least affected by other processes.
+            if change > threshold:
+                regressions.append(res.name)
+                line += "  REGRESSION"
+        elif baseline is not None:
+            line += f"{'-':>16}{'new':>10}"
+        print(line)
+    return regressions
+
+
+def main():
+    """
+    Run the benchmark suite based on the supplied command-line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark Microcosm's rules, AI, map generation, and saves.")
+    parser.add_argument("--repeats", type=int, default=20, help="The number of times to run each benchmark.")
+    parser.add_argument("--seed", type=int, default=3,
+                        help="The seed used to build the benchmarked games. Only compare runs with the same seed.")
+    parser.add_argument("--filter", default=None, help="Only run benchmarks whose names contain this.")
+    parser.add_argument("--stress", action="store_true",
+                        help=f"Also run the benchmarks against a generated state of {STRESS_PLAYERS} players, each "
+                             f"with {STRESS_SETTLEMENTS} settlements and {STRESS_UNITS} units, and {STRESS_HEATHENS} "
+                             f"heathens.")
+    parser.add_argument("--save-baseline", default=None, help="A file to write the results to as a new baseline.")
+    parser.add_argument("--compare", default=None, help="A baseline file to compare the results against.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="The proportion by which a benchmark must be slower than the baseline to be reported as "
+                             "a regression.")
+    args = parser.parse_args()
+
+    baseline = read_baseline(args.compare) if args.compare is not None else None
+    results = run_suite(args.seed, args.repeats, args.filter, args.stress)
+    regressions = print_results(results, baseline, args.threshold)
+    if args.save_baseline is not None:
+        write_baseline(results, args.save_baseline)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
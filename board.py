@@ -1,15 +1,20 @@
-import random
 import typing
-from collections import Counter
 from enum import Enum
 
+import numpy as np
 import pyxel
 
-from calculator import calculate_yield_for_quad, attack, investigate_relic
+from calculator import attack, investigate_relic
 from catalogue import get_default_unit, Namer
-from models import Player, Quad, Biome, Settlement, Unit, Heathen, GameConfig, InvestigationResult, Faction
+from image_banks import QUADS_BANK
+from models import BIOMES, Player, Quad, Biome, Settlement, Unit, Heathen, GameConfig, InvestigationResult, Faction, \
+    VisibilityMask
+from occupancy import OccupancyGrid
 from overlay import Overlay
 from overlay_display import display_overlay
+from profiler import PROFILER
+from quad_grid import QuadGrid
+from random_streams import RandomStreams
 
 
 class HelpOption(Enum):
@@ -23,17 +28,27 @@ class HelpOption(Enum):
     END_TURN = "ENTER: End turn"
 
 
+# The x position of each biome's quad image in the quads image bank, in the same order as BIOMES. The night-time
+# version of each is 32 pixels to the right.
+BIOME_TILE_X: np.ndarray = np.array([{Biome.DESERT: 0, Biome.FOREST: 8, Biome.SEA: 16}.get(biome, 24)
+                                     for biome in BIOMES])
+
+
 class Board:
     """
     The class responsible for drawing everything in-game (i.e. not on menu).
     """
 
-    def __init__(self, cfg: GameConfig, namer: Namer, quads: typing.List[typing.List[Quad]] = None):
+    def __init__(self, cfg: GameConfig, namer: Namer, quads: QuadGrid, overlay: Overlay,
+                 rngs: RandomStreams, occupancy: OccupancyGrid):
         """
-        Initialises the board with the given config and quads, if supplied.
+        Initialises the board with the given config, quads, and overlay.
         :param cfg: The game config.
         :param namer: The Namer instance to use for settlement names.
-        :param quads: The quads loaded in, if we are loading a game.
+        :param quads: The quads to draw, either freshly generated or loaded in.
+        :param overlay: The overlay to display, shared with the simulation so that it can raise notifications.
+        :param rngs: The simulation's random streams, used when the player names settlements and investigates relics.
+        :param occupancy: The simulation's occupancy grid, used to determine what the player has clicked on.
         """
         self.current_help = HelpOption.SETTLEMENT
         self.help_time_bank = 0
@@ -42,22 +57,92 @@ class Board:
 
         self.game_config: GameConfig = cfg
         self.namer: Namer = namer
+        self.rngs: RandomStreams = rngs
+        self.occupancy: OccupancyGrid = occupancy
 
-        # We allow quads to be supplied here in load game cases.
-        if quads is not None:
-            self.quads = quads
-        else:
-            self.quads: typing.List[typing.List[typing.Optional[Quad]]] = [[None] * 100 for _ in range(90)]
-            random.seed()
-            self.generate_quads(cfg.biome_clustering)
+        self.quads: QuadGrid = quads
+        # The map is drawn to an off-screen image, so that each frame only needs to copy the visible part of it to the
+        # screen. Only the visible part of the image is kept up to date, and only where quads have changed, e.g. when
+        # they are revealed, so the work done each frame doesn't grow with the size of the map.
+        self.map_image = pyxel.Image(quads.width * 8, quads.height * 8)
+        # The position of the image drawn for each quad in the map image, as returned by get_map_tiles(). Quads that
+        # haven't been drawn yet are given a position of -2.
+        self.map_tiles: np.ndarray = np.full((quads.height, quads.width, 2), -2, dtype=np.int16)
+        # The quads that the player can see at night, and the versions of the player's and heathens' entities in the
+        # occupancy grid that they were calculated from. These only change when one of the entities the player can see
+        # from moves, so they are reused between frames until then.
+        self.night_vision: typing.Optional[VisibilityMask] = None
+        self.night_vision_versions: typing.Tuple[int, int] = -1, -1
 
         self.quad_selected: typing.Optional[Quad] = None
 
-        self.overlay = Overlay()
+        self.overlay: Overlay = overlay
         self.selected_settlement: typing.Optional[Settlement] = None
         self.deploying_army = False
         self.selected_unit: typing.Optional[Unit | Heathen] = None
 
+    def get_night_vision(self, player: Player, heathens: typing.List[Heathen]) -> VisibilityMask:
+        """
+        Get the quads that the given player can see at night, recalculating them only if one of the player's units or
+        settlements has moved, been created, been removed, or changed hands since they were last calculated. The same
+        goes for heathens, for players of the Infidels faction. Changes to other players' entities can't affect what
+        the player can see, so they are ignored.
+        :param player: The human player.
+        :param heathens: The heathens, which players of the Infidels faction share vision with.
+        :return: The quads visible to the player at night.
+        """
+        versions = self.occupancy.version_of(player), \
+            self.occupancy.version_of(None) if player.faction is Faction.INFIDELS else 0
+        if self.night_vision is None or self.night_vision_versions != versions:
+            self.night_vision = VisibilityMask(self.quads.width, self.quads.height)
+            for setl in player.settlements:
+                self.night_vision.reveal(setl.location, 3)
+            for unit in player.units:
+                self.night_vision.reveal(unit.location, 3)
+            # Players of the Infidels faction share vision with Heathen units.
+            if player.faction is Faction.INFIDELS:
+                for heathen in heathens:
+                    self.night_vision.reveal(heathen.location, 5)
+            self.night_vision_versions = versions
+        return self.night_vision
+
+    def get_map_tiles(self, quads_to_show: VisibilityMask, show_all: bool, is_night: bool,
+                      area: typing.Tuple[slice, slice]) -> np.ndarray:
+        """
+        Determine the image to draw for every quad in the given area of the map.
+        :param quads_to_show: The quads that the player can currently see.
+        :param show_all: Whether every quad should be shown regardless of whether the player can see it.
+        :param is_night: Whether it is currently night.
+        :param area: The rows and columns of the area.
+        :return: The position of each quad's image in the quads image bank, indexed by row and then column within the
+        area. Quads that shouldn't be drawn at all are given a position of -1.
+        """
+        biomes = self.quads.biomes[area]
+        tiles = np.empty(biomes.shape + (2,), dtype=np.int16)
+        tiles[..., 0] = BIOME_TILE_X[biomes] + (32 if is_night else 0)
+        tiles[..., 1] = np.where(self.quads.relics[area], 20, 4)
+        if not show_all:
+            # Quads that the player can't see are covered by fog during the day, and aren't drawn at all at night.
+            tiles[~quads_to_show.seen[area]] = -1 if is_night else (0, 12)
+        return tiles
+
+    def update_map_image(self, tiles: np.ndarray, area: typing.Tuple[slice, slice]):
+        """
+        Redraw the quads in the given area of the map image whose images have changed since they were last drawn.
+        :param tiles: The image to draw for every quad in the area, as returned by get_map_tiles().
+        :param area: The rows and columns of the area.
+        """
+        drawn_tiles = self.map_tiles[area]
+        top, left = area[0].start, area[1].start
+        for j, i in np.argwhere(np.any(tiles != drawn_tiles, axis=2)):
+            quad_x, quad_y = int(tiles[j, i, 0]), int(tiles[j, i, 1])
+            if quad_x == -1:
+                self.map_image.rect((left + i) * 8, (top + j) * 8, 8, 8, pyxel.COLOR_BLACK)
+            else:
+                self.map_image.blt((left + i) * 8, (top + j) * 8, QUADS_BANK, quad_x, quad_y, 8, 8)
+        drawn_tiles[:] = tiles
+
+    @PROFILER.timed("Board.draw")
     def draw(self, players: typing.List[Player], map_pos: (int, int), turn: int, heathens: typing.List[Heathen],
              is_night: bool, turns_until_change: int):
         """
@@ -73,58 +158,31 @@ class Board:
         pyxel.cls(0)
         pyxel.rectb(0, 0, 200, 184, pyxel.COLOR_WHITE)
 
-        pyxel.load("resources/quads.pyxres")
         selected_quad_coords: (int, int) = None
-        quads_to_show: typing.Set[typing.Tuple[int, int]] = set()
+        quads_to_show: VisibilityMask
         # At nighttime, the player can only see a few quads around their settlements and units. However, players of the
         # Nocturne faction have no vision impacts at nighttime.
         if is_night and players[0].faction is not Faction.NOCTURNE:
-            for setl in players[0].settlements:
-                for i in range(setl.location[0] - 3, setl.location[0] + 4):
-                    for j in range(setl.location[1] - 3, setl.location[1] + 4):
-                        quads_to_show.add((i, j))
-            for unit in players[0].units:
-                for i in range(unit.location[0] - 3, unit.location[0] + 4):
-                    for j in range(unit.location[1] - 3, unit.location[1] + 4):
-                        quads_to_show.add((i, j))
-            # Players of the Infidels faction share vision with Heathen units.
-            if players[0].faction is Faction.INFIDELS:
-                for heathen in heathens:
-                    for i in range(heathen.location[0] - 5, heathen.location[0] + 6):
-                        for j in range(heathen.location[1] - 5, heathen.location[1] + 6):
-                            quads_to_show.add((i, j))
+            quads_to_show = self.get_night_vision(players[0], heathens)
         else:
             quads_to_show = players[0].quads_seen
         fog_of_war_impacts: bool = self.game_config.fog_of_war or \
             (is_night and players[0].faction is not Faction.NOCTURNE)
-        # Draw the quads.
-        for i in range(map_pos[0], map_pos[0] + 24):
-            for j in range(map_pos[1], map_pos[1] + 22):
-                if 0 <= i <= 99 and 0 <= j <= 89:
-                    # Draw the quad if fog of war is off, or if the player has seen the quad, or we're in the tutorial.
-                    # This same logic applies to all subsequent draws.
-                    if (i, j) in quads_to_show or len(players[0].settlements) == 0 or not fog_of_war_impacts:
-                        quad = self.quads[j][i]
-                        match quad.biome:
-                            case Biome.DESERT:
-                                quad_x = 0
-                            case Biome.FOREST:
-                                quad_x = 8
-                            case Biome.SEA:
-                                quad_x = 16
-                            case _:
-                                quad_x = 24
-                        quad_y = 20 if quad.is_relic else 4
-                        if is_night:
-                            quad_x += 32
-                        pyxel.blt((i - map_pos[0]) * 8 + 4, (j - map_pos[1]) * 8 + 4, 0, quad_x, quad_y, 8, 8)
-                        if quad.selected:
-                            selected_quad_coords = i, j
-                            pyxel.rectb((i - map_pos[0]) * 8 + 4, (j - map_pos[1]) * 8 + 4, 8, 8, pyxel.COLOR_RED)
-                    elif not is_night:
-                        pyxel.blt((i - map_pos[0]) * 8 + 4, (j - map_pos[1]) * 8 + 4, 0, 0, 12, 8, 8)
+        # Draw the quads. Draw the quad if fog of war is off, or if the player has seen the quad, or we're in the
+        # tutorial. This same logic applies to all subsequent draws.
+        show_all_quads = len(players[0].settlements) == 0 or not fog_of_war_impacts
+        left, top = max(map_pos[0], 0), max(map_pos[1], 0)
+        right, bottom = min(map_pos[0] + 24, self.quads.width), min(map_pos[1] + 22, self.quads.height)
+        visible_area = slice(top, bottom), slice(left, right)
+        self.update_map_image(self.get_map_tiles(quads_to_show, show_all_quads, is_night, visible_area), visible_area)
+        # The visible part of the map is then drawn in one go, leaving anything beyond the edge of the map black.
+        pyxel.blt((left - map_pos[0]) * 8 + 4, (top - map_pos[1]) * 8 + 4, self.map_image,
+                  left * 8, top * 8, (right - left) * 8, (bottom - top) * 8)
+        for j, i in np.argwhere(self.quads.selected[top:bottom, left:right]) + (top, left):
+            if show_all_quads or (i, j) in quads_to_show:
+                selected_quad_coords = int(i), int(j)
+                pyxel.rectb((i - map_pos[0]) * 8 + 4, (j - map_pos[1]) * 8 + 4, 8, 8, pyxel.COLOR_RED)
 
-        pyxel.load("resources/sprites.pyxres")
         # Draw the heathens.
         for heathen in heathens:
             if (not fog_of_war_impacts or heathen.location in quads_to_show) and \
@@ -308,50 +366,6 @@ class Board:
                 self.overlay.toggle_siege_notif(None, None)
                 self.siege_time_bank = 0
 
-    def generate_quads(self, biome_clustering: bool):
-        """
-        Generate the quads to be used for this game.
-        :param biome_clustering: Whether biome clustering is enabled or not.
-        """
-        for i in range(90):
-            for j in range(100):
-                if biome_clustering:
-                    # The below block of code gets all directly adjacent quads to the one being currently generated.
-                    surrounding_biomes = []
-                    if i > 0:
-                        if j > 0:
-                            surrounding_biomes.append(self.quads[i - 1][j - 1].biome)
-                        surrounding_biomes.append(self.quads[i - 1][j].biome)
-                        if j < 99:
-                            surrounding_biomes.append(self.quads[i - 1][j + 1].biome)
-                    if j > 0:
-                        surrounding_biomes.append(self.quads[i][j - 1].biome)
-                    if len(surrounding_biomes) > 0:
-                        # Work out which biome nearby is most prevalent, and 40% of the time, choose that biome. This
-                        # 40% rate is adjustable. Note that 100% would result in the entire board having the same biome
-                        # and 0% would result in random picks.
-                        biome_ctr = Counter(surrounding_biomes)
-                        max_rate: Biome = max(biome_ctr, key=biome_ctr.get)
-                        biome: Biome
-                        rand = random.random()
-                        if rand < 0.4:
-                            biome = max_rate
-                        else:
-                            biome = random.choice(list(Biome))
-                    else:
-                        biome = random.choice(list(Biome))
-                else:
-                    # If we're not using biome clustering, just randomly choose one.
-                    biome = random.choice(list(Biome))
-                quad_yield: (float, float, float, float) = calculate_yield_for_quad(biome)
-
-                is_relic = False
-                relic_chance = random.randint(0, 100)
-                if relic_chance < 1:
-                    is_relic = True
-
-                self.quads[i][j] = Quad(biome, *quad_yield, is_relic=is_relic)
-
     def process_right_click(self, mouse_x: int, mouse_y: int, map_pos: (int, int)):
         """
         Process a right click by the player at given coordinates with the current map position.
@@ -372,6 +386,9 @@ class Board:
             # Work out which quad they've clicked, and select it.
             adj_x = int((mouse_x - 4) / 8) + map_pos[0]
             adj_y = int((mouse_y - 4) / 8) + map_pos[1]
+            # Clicks just beyond the edge of the map don't select anything.
+            if not (0 <= adj_x < self.quads.width and 0 <= adj_y < self.quads.height):
+                return
             self.quads[adj_y][adj_x].selected = not self.quads[adj_y][adj_x].selected
             if self.quad_selected is not None:
                 self.quad_selected.selected = False
@@ -379,8 +396,7 @@ class Board:
 
     def process_left_click(self, mouse_x: int, mouse_y: int, settled: bool,
                            player: Player, map_pos: (int, int), heathens: typing.List[Heathen],
-                           all_units: typing.List[Unit], all_players: typing.List[Player],
-                           other_setls: typing.List[Settlement]):
+                           all_players: typing.List[Player]):
         """
         Process a left click by the player at given coordinates.
         :param mouse_x: The X coordinate of the mouse click.
@@ -389,9 +405,7 @@ class Board:
         :param player: The non-AI player.
         :param map_pos: The current map position.
         :param heathens: The list of Heathens.
-        :param all_units: The list of all Units in the game.
         :param all_players: The list of all Players in the game, AI or not.
-        :param other_setls: The list of all AI Settlements.
         """
         # Ensure that we only process left clicks in situations where it makes sense for the player to be able to click
         # the map. For example, if the player is choosing a construction for a settlement, they should not be able to
@@ -409,12 +423,12 @@ class Board:
             # Again, determine the quad.
             adj_x = int((mouse_x - 4) / 8) + map_pos[0]
             adj_y = int((mouse_y - 4) / 8) + map_pos[1]
-            if 0 <= adj_x <= 99 and 0 <= adj_y <= 89:
+            if 0 <= adj_x < self.quads.width and 0 <= adj_y < self.quads.height:
                 if not settled:
                     # If the player has not founded a settlement yet, then this first click denotes where their first
                     # settlement will be.
                     quad_biome = self.quads[adj_y][adj_x].biome
-                    setl_name = self.namer.get_settlement_name(quad_biome)
+                    setl_name = self.namer.get_settlement_name(quad_biome, self.rngs.names)
                     new_settl = Settlement(setl_name, (adj_x, adj_y), [], [self.quads[adj_y][adj_x]],
                                            [get_default_unit((adj_x, adj_y))])
                     match player.faction:
@@ -426,15 +440,31 @@ class Board:
                             new_settl.strength /= 2
                             new_settl.max_strength /= 2
                     player.settlements.append(new_settl)
+                    self.occupancy.add(new_settl, player)
                     # Automatically add 5 quads in either direction to the player's seen.
-                    for i in range(adj_y - 5, adj_y + 6):
-                        for j in range(adj_x - 5, adj_x + 6):
-                            player.quads_seen.add((j, i))
+                    player.quads_seen.reveal((adj_x, adj_y), 5)
                     self.overlay.toggle_tutorial()
                     # Select the new settlement.
                     self.selected_settlement = new_settl
                     self.overlay.toggle_settlement(new_settl, player)
                 else:
+                    # Work out what the player has clicked on. Where there are multiple of the same kind of entity on
+                    # the quad, the first one is used.
+                    clicked_heathen: typing.Optional[Heathen] = None
+                    clicked_unit: typing.Optional[Unit] = None
+                    clicked_own_setl: typing.Optional[Settlement] = None
+                    clicked_other_setl: typing.Optional[Settlement] = None
+                    for occupant in self.occupancy.at((adj_x, adj_y)):
+                        if isinstance(occupant, Heathen):
+                            clicked_heathen = clicked_heathen or occupant
+                        elif isinstance(occupant, Unit):
+                            clicked_unit = clicked_unit or occupant
+                        elif self.occupancy.owner_of(occupant) is player:
+                            clicked_own_setl = clicked_own_setl or occupant
+                        else:
+                            clicked_other_setl = clicked_other_setl or occupant
+                    # Only the player's own deployed units can be given orders.
+                    selected_owner = None if self.selected_unit is None else self.occupancy.owner_of(self.selected_unit)
                     # If the player has selected a settlement, but has now clicked elsewhere, deselect the settlement.
                     if not self.deploying_army and \
                             self.selected_settlement is not None and \
@@ -444,21 +474,21 @@ class Board:
                     # If the player has selected neither a unit or settlement, and they have clicked on one of their
                     # settlements, select it.
                     elif self.selected_unit is None and self.selected_settlement is None and \
-                            any((to_select := setl).location == (adj_x, adj_y) for setl in player.settlements):
-                        self.selected_settlement = to_select
-                        self.overlay.toggle_settlement(to_select, player)
+                            clicked_own_setl is not None:
+                        self.selected_settlement = clicked_own_setl
+                        self.overlay.toggle_settlement(clicked_own_setl, player)
                     # If the player has selected a unit, and they have clicked on one of their settlements, garrison the
                     # selected unit in the settlement, ensuring it is within range.
-                    elif self.selected_unit is not None and self.selected_unit in player.units and \
-                            self.selected_settlement is None and \
-                            any((to_select := setl).location == (adj_x, adj_y) for setl in player.settlements) and \
+                    elif selected_owner is player and \
+                            self.selected_settlement is None and clicked_own_setl is not None and \
                             self.selected_unit.location[0] - self.selected_unit.remaining_stamina <= adj_x <= \
                             self.selected_unit.location[0] + self.selected_unit.remaining_stamina and \
                             self.selected_unit.location[1] - self.selected_unit.remaining_stamina <= adj_y <= \
                             self.selected_unit.location[1] + self.selected_unit.remaining_stamina:
                         self.selected_unit.garrisoned = True
-                        to_select.garrison.append(self.selected_unit)
+                        clicked_own_setl.garrison.append(self.selected_unit)
                         player.units.remove(self.selected_unit)
+                        self.occupancy.remove(self.selected_unit)
                         # Deselect the unit now.
                         self.selected_unit = None
                         self.overlay.toggle_unit(None)
@@ -473,10 +503,9 @@ class Board:
                         deployed.garrisoned = False
                         deployed.location = adj_x, adj_y
                         player.units.append(deployed)
+                        self.occupancy.add(deployed, player)
                         # Add the surrounding quads to the player's seen.
-                        for i in range(adj_y - 5, adj_y + 6):
-                            for j in range(adj_x - 5, adj_x + 6):
-                                player.quads_seen.add((j, i))
+                        player.quads_seen.reveal((adj_x, adj_y), 5)
                         self.deploying_army = False
                         # Select the unit and deselect the settlement.
                         self.selected_unit = deployed
@@ -485,23 +514,24 @@ class Board:
                         self.overlay.toggle_settlement(None, player)
                         self.overlay.toggle_unit(deployed)
                     # If the player has not selected a unit and they've clicked on a heathen, select it.
-                    elif self.selected_unit is None and \
-                            any((to_select := heathen).location == (adj_x, adj_y) for heathen in heathens):
-                        self.selected_unit = to_select
-                        self.overlay.toggle_unit(to_select)
+                    elif self.selected_unit is None and clicked_heathen is not None:
+                        self.selected_unit = clicked_heathen
+                        self.overlay.toggle_unit(clicked_heathen)
                     # If the player has selected one of their units and it hasn't attacked, and they've clicked on
                     # either an enemy unit or a heathen within range, attack it.
                     elif self.selected_unit is not None and not isinstance(self.selected_unit, Heathen) and \
-                            self.selected_unit in player.units and not self.selected_unit.has_attacked and \
-                            (any((to_attack := heathen).location == (adj_x, adj_y) for heathen in heathens) or
-                             any((to_attack := unit).location == (adj_x, adj_y) for unit in all_units)):
-                        if self.selected_unit is not to_attack and to_attack not in player.units and \
+                            selected_owner is player and not self.selected_unit.has_attacked and \
+                            (clicked_heathen is not None or clicked_unit is not None):
+                        to_attack = clicked_heathen or clicked_unit
+                        to_attack_owner = self.occupancy.owner_of(to_attack)
+                        if self.selected_unit is not to_attack and to_attack_owner is not player and \
                                 abs(self.selected_unit.location[0] - to_attack.location[0]) <= 1 and \
                                 abs(self.selected_unit.location[1] - to_attack.location[1]) <= 1:
                             data = attack(self.selected_unit, to_attack, ai=False)
                             # Destroy the player's unit if it died.
                             if self.selected_unit.health <= 0:
                                 player.units.remove(self.selected_unit)
+                                self.occupancy.remove(self.selected_unit)
                                 self.selected_unit = None
                                 self.overlay.toggle_unit(None)
                             # Destroy the heathen/enemy unit if it died.
@@ -509,39 +539,33 @@ class Board:
                                 if to_attack in heathens:
                                     heathens.remove(to_attack)
                                 else:
-                                    for p in all_players:
-                                        if to_attack in p.units:
-                                            p.units.remove(to_attack)
-                                            break
+                                    to_attack_owner.units.remove(to_attack)
+                                self.occupancy.remove(to_attack)
                             # Show the attack results.
                             self.overlay.toggle_attack(data)
                             self.attack_time_bank = 0
                         # However, if the player clicked on another of their units, select that rather than attacking.
-                        elif to_attack in player.units:
+                        elif to_attack_owner is player:
                             self.selected_unit = to_attack
                             self.overlay.update_unit(to_attack)
                     # If the player has selected one of their units and it hasn't attacked, and the player clicks on an
                     # enemy settlement within range, bring up the overlay to prompt the player on their action.
                     elif self.selected_unit is not None and not isinstance(self.selected_unit, Heathen) and \
-                            self.selected_unit in player.units and not self.selected_unit.has_attacked and \
-                            any((to_attack := setl).location == (adj_x, adj_y) for setl in other_setls):
-                        if abs(self.selected_unit.location[0] - to_attack.location[0]) <= 1 and \
-                                abs(self.selected_unit.location[1] - to_attack.location[1]) <= 1:
-                            for p in all_players:
-                                if to_attack in p.settlements:
-                                    self.overlay.toggle_setl_click(to_attack, p)
+                            selected_owner is player and not self.selected_unit.has_attacked and \
+                            clicked_other_setl is not None:
+                        if abs(self.selected_unit.location[0] - clicked_other_setl.location[0]) <= 1 and \
+                                abs(self.selected_unit.location[1] - clicked_other_setl.location[1]) <= 1:
+                            self.overlay.toggle_setl_click(clicked_other_setl,
+                                                           self.occupancy.owner_of(clicked_other_setl))
                     # If the player has not selected a unit and they click on one, select it.
-                    elif self.selected_unit is None and \
-                            any((to_select := unit).location == (adj_x, adj_y) for unit in all_units):
-                        self.selected_unit = to_select
-                        self.overlay.toggle_unit(to_select)
+                    elif self.selected_unit is None and clicked_unit is not None:
+                        self.selected_unit = clicked_unit
+                        self.overlay.toggle_unit(clicked_unit)
                     # If the player has selected one of their units and they've clicked an empty quad within range, move
                     # the unit there.
                     elif self.selected_unit is not None and not isinstance(self.selected_unit, Heathen) and \
-                            not any(heathen.location == (adj_x, adj_y) for heathen in heathens) and \
-                            self.selected_unit in player.units and \
-                            not any(unit.location == (adj_x, adj_y) for unit in all_units) and \
-                            not any(setl.location == (adj_x, adj_y) for setl in other_setls) and \
+                            clicked_heathen is None and selected_owner is player and \
+                            clicked_unit is None and clicked_other_setl is None and \
                             not self.quads[adj_y][adj_x].is_relic and \
                             self.selected_unit.location[0] - self.selected_unit.remaining_stamina <= adj_x <= \
                             self.selected_unit.location[0] + self.selected_unit.remaining_stamina and \
@@ -550,27 +574,27 @@ class Board:
                         # Any unit that moves while sieging ends their siege on the settlement.
                         if self.selected_unit.sieging:
                             self.selected_unit.sieging = False
-                            for setl in other_setls:
-                                if setl.under_siege_by is self.selected_unit:
-                                    setl.under_siege_by = None
+                            for p in all_players[1:]:
+                                for setl in p.settlements:
+                                    if setl.under_siege_by is self.selected_unit:
+                                        setl.under_siege_by = None
                         initial = self.selected_unit.location
                         distance_travelled = max(abs(initial[0] - adj_x), abs(initial[1] - adj_y))
                         self.selected_unit.remaining_stamina -= distance_travelled
-                        self.selected_unit.location = adj_x, adj_y
+                        self.occupancy.move(self.selected_unit, (adj_x, adj_y))
                         # Update the player's seen quads.
-                        for i in range(adj_y - 5, adj_y + 6):
-                            for j in range(adj_x - 5, adj_x + 6):
-                                player.quads_seen.add((j, i))
+                        player.quads_seen.reveal((adj_x, adj_y), 5)
                     # If the player has selected one of their units and clicked on a relic, investigate it, providing
                     # that their unit is close enough.
-                    elif self.selected_unit is not None and self.selected_unit in player.units and \
+                    elif selected_owner is player and \
                             self.quads[adj_y][adj_x].is_relic:
                         if abs(self.selected_unit.location[0] - adj_x) <= 1 and \
                                 abs(self.selected_unit.location[1] - adj_y) <= 1:
                             result: InvestigationResult = investigate_relic(player,
                                                                             self.selected_unit,
                                                                             (adj_x, adj_y),
-                                                                            self.game_config)
+                                                                            self.game_config,
+                                                                            self.rngs.relics)
                             # Relics cease to exist once investigated.
                             self.quads[adj_y][adj_x].is_relic = False
                             self.overlay.toggle_investigation(result)
@@ -592,7 +616,7 @@ class Board:
                 break
         if can_settle:
             quad_biome = self.quads[self.selected_unit.location[1]][self.selected_unit.location[0]].biome
-            setl_name = self.namer.get_settlement_name(quad_biome)
+            setl_name = self.namer.get_settlement_name(quad_biome, self.rngs.names)
             new_settl = Settlement(setl_name, self.selected_unit.location, [],
                                    [self.quads[self.selected_unit.location[1]][self.selected_unit.location[0]]], [])
             if player.faction is Faction.FRONTIERSMEN:
@@ -601,8 +625,10 @@ class Board:
                 new_settl.strength /= 2
                 new_settl.max_strength /= 2
             player.settlements.append(new_settl)
+            self.occupancy.add(new_settl, player)
             # Destroy the settler unit and select the new settlement.
             player.units.remove(self.selected_unit)
+            self.occupancy.remove(self.selected_unit)
             self.selected_unit = None
             self.overlay.toggle_unit(None)
             self.selected_settlement = new_settl
@@ -1,44 +1,96 @@
 import random
+import typing
 from copy import deepcopy
 
-from models import Biome, Unit, Heathen, AttackData, Player, EconomicStatus, HarvestStatus, Settlement, Improvement, \
+import numpy as np
+
+from models import BIOMES, Unit, Heathen, AttackData, Player, EconomicStatus, HarvestStatus, Settlement, Improvement, \
     UnitPlan, SetlAttackData, GameConfig, InvestigationResult, Faction, Project, ProjectType
+from quad_grid import QuadGrid
+
 
+# The range of each of the wealth, harvest, zeal, and fortune yields for quads of each biome, in the order of BIOMES.
+BIOME_YIELD_RANGES: np.ndarray = np.array([
+    # Desert
+    [(5.0, 9.0), (0.0, 1.0), (3.0, 6.0), (1.0, 4.0)],
+    # Forest
+    [(0.0, 2.0), (5.0, 9.0), (1.0, 4.0), (3.0, 6.0)],
+    # Sea
+    [(1.0, 4.0), (3.0, 6.0), (0.0, 1.0), (5.0, 9.0)],
+    # Mountain
+    [(3.0, 6.0), (1.0, 4.0), (5.0, 9.0), (0.0, 2.0)]
+])
+# The version of the map generation in generate_quads(). Binary saves store maps generated from a seed as the changes
+# made to them since, so this must be incremented whenever the same seed would generate a different map, so that those
+# saves can be rejected cleanly rather than being loaded with the wrong map.
+MAP_GENERATOR_VERSION = 1
 
-def calculate_yield_for_quad(biome: Biome) -> (float, float, float, float):
+
+def cluster_biomes(random_biomes: np.ndarray, follow_neighbours: np.ndarray) -> np.ndarray:
     """
-    Given the supplied biome, generate a random yield to be used for a quad.
-    :param biome: The biome of the quad-to-be.
-    :return: A tuple of wealth, harvest, zeal, and fortune.
+    Cluster the given biomes. Going through the grid row by row, each quad has a chance to take on the most prevalent
+    biome of the quads directly adjacent to it that come before it, i.e. the three above it and the one to its left.
+    Where multiple biomes are equally prevalent, the one that appears first in that order is chosen.
+    Since each quad only depends on these four, all quads that share the same value of 2 * row + column are independent
+    of one another, so rather than going through each quad one at a time, we go through these diagonal 'wavefronts',
+    clustering each one at once.
+    :param random_biomes: The randomly-chosen biome index for each quad, used when it does not follow its neighbours.
+    :param follow_neighbours: Whether each quad takes on the most prevalent biome of its neighbours.
+    :return: The clustered biome index for each quad.
     """
-    wealth: float = 0
-    harvest: float = 0
-    zeal: float = 0
-    fortune: float = 0
+    height, width = random_biomes.shape
+    # Pad the grid with a border of -1 on the top, left, and right, so that quads on the edges have 'missing'
+    # neighbours rather than needing special cases. The grid is also flattened, so that each neighbour is just an
+    # offset away.
+    padded_width = width + 2
+    biomes = np.full((height + 1) * padded_width, -1, dtype=np.int8)
+    biomes.reshape(height + 1, padded_width)[1:, 1:-1] = random_biomes
+    neighbour_offsets = np.array([-padded_width - 1, -padded_width, -padded_width + 1, -1])
+    for wavefront in range(2 * (height - 1) + width):
+        rows = np.arange(max(0, (wavefront - width + 2) // 2), min(height - 1, wavefront // 2) + 1)
+        rows = rows[follow_neighbours[rows, wavefront - 2 * rows]]
+        if len(rows) == 0:
+            continue
+        positions = (rows + 1) * padded_width + (wavefront - 2 * rows + 1)
+        neighbours = biomes[positions[:, np.newaxis] + neighbour_offsets]
+        # Count how many times each neighbour's biome appears amongst the neighbours. Taking the first neighbour with
+        # the highest count gives us the most prevalent biome, with ties going to the one that appears first.
+        counts = (neighbours[:, :, np.newaxis] == neighbours[:, np.newaxis, :]).sum(axis=2)
+        counts[neighbours == -1] = 0
+        chosen = counts.argmax(axis=1)
+        # The very first quad has no neighbours, so it keeps its random biome.
+        has_neighbours = counts[np.arange(len(rows)), chosen] > 0
+        biomes[positions[has_neighbours]] = neighbours[has_neighbours, chosen[has_neighbours]]
+    return biomes.reshape(height + 1, padded_width)[1:, 1:-1].astype(np.uint8)
 
-    match biome:
-        case Biome.FOREST:
-            wealth = random.uniform(0.0, 2.0)
-            harvest = random.uniform(5.0, 9.0)
-            zeal = random.uniform(1.0, 4.0)
-            fortune = random.uniform(3.0, 6.0)
-        case Biome.SEA:
-            wealth = random.uniform(1.0, 4.0)
-            harvest = random.uniform(3.0, 6.0)
-            zeal = random.uniform(0.0, 1.0)
-            fortune = random.uniform(5.0, 9.0)
-        case Biome.DESERT:
-            wealth = random.uniform(5.0, 9.0)
-            harvest = random.uniform(0.0, 1.0)
-            zeal = random.uniform(3.0, 6.0)
-            fortune = random.uniform(1.0, 4.0)
-        case Biome.MOUNTAIN:
-            wealth = random.uniform(3.0, 6.0)
-            harvest = random.uniform(1.0, 4.0)
-            zeal = random.uniform(5.0, 9.0)
-            fortune = random.uniform(0.0, 2.0)
 
-    return wealth, harvest, zeal, fortune
+def generate_quads(biome_clustering: bool, rng: random.Random, width: int = 100, height: int = 90) -> QuadGrid:
+    """
+    Generate the quads to be used for a game. All quads are generated at once, rather than one at a time.
+    :param biome_clustering: Whether biome clustering is enabled or not.
+    :param rng: The random number generator to use. Given the same generator state, the same quads are generated.
+    :param width: The number of quads in each row of the map.
+    :param height: The number of rows in the map.
+    :return: The generated grid of quads, indexed by row and then column.
+    """
+    np_rng = np.random.default_rng(rng.getrandbits(64))
+    quads = QuadGrid(width, height)
+    random_biomes = np_rng.integers(0, len(BIOMES), size=(height, width), dtype=np.uint8)
+    if biome_clustering:
+        # 40% of the time, quads take on the most prevalent biome nearby. This 40% rate is adjustable. Note that 100%
+        # would result in the entire board having the same biome and 0% would result in random picks.
+        quads.biomes = cluster_biomes(random_biomes, np_rng.random((height, width)) < 0.4)
+    else:
+        # If we're not using biome clustering, just randomly choose one.
+        quads.biomes = random_biomes
+    # Each yield is uniformly distributed within the range for the quad's biome.
+    ranges = BIOME_YIELD_RANGES[quads.biomes]
+    quads.yields = (ranges[..., 0] + np_rng.random((height, width, 4)) * (ranges[..., 1] - ranges[..., 0])) \
+        .astype(np.float32)
+    # Each quad has a 1 in 101 chance of containing a relic.
+    quads.relics = np_rng.integers(0, 101, size=(height, width)) < 1
+    quads.generated_relics = quads.relics.copy()
+    return quads
 
 
 def clamp(number: int, min_val: int, max_val: int) -> int:
@@ -119,14 +171,43 @@ def get_setl_totals(player: Player,
                     is_night: bool,
                     strict: bool = False) -> (float, float, float, float):
     """
-    Get the wealth, harvest, zeal, and fortune totals for the given Settlement.
+    Get the wealth, harvest, zeal, and fortune totals for the given Settlement. Totals are cached on the settlement, and
+    only recalculated when something they depend on has changed.
     :param player: The owner of the settlement.
-    :param setl: The settlement to calculate totals for.
+    :param setl: The settlement to get totals for.
     :param is_night: Whether it is night. Used as harvest is halved and fortune increased by 10% at night.
     :param strict: Whether the total should be 0 as opposed to 0.5 in situations where the total would be negative.
     Only used for the settlement overlay, as we want users to make progress even if their zeal/fortune is 0.
     :return: A tuple containing the settlement's wealth, harvest, zeal, and fortune.
     """
+    # Rather than requiring every change to a settlement to mark its totals as out of date, we keep track of the state
+    # that the totals were calculated from, and recalculate them if any of it has changed. Improvements are only ever
+    # added to settlements, so their count is enough to tell whether they have changed. The owner's faction is included
+    # because settlements can be captured.
+    work = setl.current_work.construction if setl.current_work is not None else None
+    state = (player.faction, setl.level, len(setl.improvements), len(setl.quads), setl.harvest_status,
+             setl.economic_status, work.type if isinstance(work, Project) else None, setl.under_siege_by is not None)
+    cached = setl.totals_cache.get((is_night, strict))
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    totals = calculate_setl_totals(player, setl, is_night, strict)
+    setl.totals_cache[(is_night, strict)] = state, totals
+    return totals
+
+
+def calculate_setl_totals(player: Player,
+                          setl: Settlement,
+                          is_night: bool,
+                          strict: bool = False) -> (float, float, float, float):
+    """
+    Calculate the wealth, harvest, zeal, and fortune totals for the given Settlement from scratch. In most cases,
+    get_setl_totals() should be used instead.
+    :param player: The owner of the settlement.
+    :param setl: The settlement to calculate totals for.
+    :param is_night: Whether it is night. Used as harvest is halved and fortune increased by 10% at night.
+    :param strict: Whether the total should be 0 as opposed to 0.5 in situations where the total would be negative.
+    :return: A tuple containing the settlement's wealth, harvest, zeal, and fortune.
+    """
 
     # For each of the four categories, add together the values for all of the settlement's quads and improvements. If
     # negative, return 0 for wealth and harvest, and 0.5 for zeal and fortune. Also, use the settlement's level to add
@@ -218,7 +299,8 @@ def complete_construction(setl: Settlement, player: Player):
     setl.current_work = None
 
 
-def investigate_relic(player: Player, unit: Unit, relic_loc: (int, int), cfg: GameConfig) -> InvestigationResult:
+def investigate_relic(player: Player, unit: Unit, relic_loc: (int, int), cfg: GameConfig,
+                      rng: random.Random) -> InvestigationResult:
     """
     Investigate a relic with the given unit.
     Possible rewards include:
@@ -234,9 +316,10 @@ def investigate_relic(player: Player, unit: Unit, relic_loc: (int, int), cfg: Ga
     :param relic_loc: The location of the relic.
     :param cfg: The game configuration, used to determine whether to grant vision bonuses, which are useless when fog of
     war is disabled.
+    :param rng: The random number generator to use.
     :return: The type of investigation result, i.e. the bonus granted, if there is one.
     """
-    random_chance = random.randint(0, 100)
+    random_chance = rng.randint(0, 100)
     # Scrutineers always succeed when investigating.
     was_successful = True if player.faction is Faction.SCRUTINEERS else random_chance < 70
     if was_successful:
@@ -247,9 +330,7 @@ def investigate_relic(player: Player, unit: Unit, relic_loc: (int, int), cfg: Ga
             player.wealth += 25
             return InvestigationResult.WEALTH
         if random_chance < 30 and cfg.fog_of_war:
-            for i in range(relic_loc[1] - 10, relic_loc[1] + 11):
-                for j in range(relic_loc[0] - 10, relic_loc[0] + 11):
-                    player.quads_seen.add((j, i))
+            player.quads_seen.reveal(relic_loc, 10)
             return InvestigationResult.VISION
         if random_chance < 40:
             unit.plan.max_health += 5
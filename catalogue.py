@@ -1,8 +1,7 @@
 import random
 import typing
 from copy import deepcopy
-
-import pyxel
+from dataclasses import replace
 
 from models import Player, Improvement, ImprovementType, Effect, Blessing, Settlement, UnitPlan, Unit, Biome, Heathen, \
     Faction, Project, ProjectType
@@ -44,13 +43,17 @@ class Namer:
     def __init__(self):
         self.names = deepcopy(SETL_NAMES)
 
-    def get_settlement_name(self, biome: Biome) -> str:
+    def get_settlement_name(self, biome: Biome, rng: random.Random) -> str:
         """
         Returns a settlement name for the given biome.
         :param biome: The biome of the settlement-to-be.
+        :param rng: The random number generator to choose the name with.
         :return: A settlement name.
         """
-        name = random.choice(self.names[biome])
+        # In very large games, every name for a biome may have been used, in which case the names are reused.
+        if not self.names[biome]:
+            self.names[biome] = list(SETL_NAMES[biome])
+        name = rng.choice(self.names[biome])
         # Note that we remove the settlement name to avoid duplicates.
         self.names[biome].remove(name)
         return name
@@ -61,7 +64,9 @@ class Namer:
         :param name: The settlement name to remove.
         :param biome: The biome of the settlement. Used to locate the name in the dictionary.
         """
-        self.names[biome].remove(name)
+        # Names may have already been removed if they have been reused.
+        if name in self.names[biome]:
+            self.names[biome].remove(name)
 
     def reset(self):
         """
@@ -198,22 +203,83 @@ UNIT_PLANS = [
     UnitPlan(40, 400, 2, "Fanatic", BLESSINGS["brd_fan"], 1200)
 ]
 
+# Indexes of the above, keyed by name, so that lookups don't require a scan of each list. Built once, at import time.
+IMPROVEMENTS_BY_NAME: typing.Dict[str, Improvement] = {imp.name: imp for imp in IMPROVEMENTS}
+PROJECTS_BY_NAME: typing.Dict[str, Project] = {prj.name: prj for prj in PROJECTS}
+BLESSINGS_BY_NAME: typing.Dict[str, Blessing] = {bls.name: bls for bls in BLESSINGS.values()}
+UNIT_PLANS_BY_NAME: typing.Dict[str, UnitPlan] = {up.name: up for up in UNIT_PLANS}
+# The improvements and unit plans unlocked by each blessing, keyed by the blessing's name. Names are used rather than
+# the blessings themselves because players' blessings may be copies, with adjusted costs.
+UNLOCKABLE_IMPROVEMENTS: typing.Dict[str, typing.List[Improvement]] = \
+    {bls.name: [imp for imp in IMPROVEMENTS if imp.prereq is not None and imp.prereq.name == bls.name]
+     for bls in BLESSINGS.values()}
+UNLOCKABLE_UNITS: typing.Dict[str, typing.List[UnitPlan]] = \
+    {bls.name: [up for up in UNIT_PLANS if up.prereq is not None and up.prereq.name == bls.name]
+     for bls in BLESSINGS.values()}
+
+
+def adjust_unit_plan(unit_plan: UnitPlan, faction: Faction) -> UnitPlan:
+    """
+    Apply the given faction's unit modifiers to a unit plan.
+    :param unit_plan: The unit plan to adjust.
+    :param faction: The faction to adjust the plan for.
+    :return: A new UnitPlan with the modifiers applied, or the given one if the faction has no unit modifiers.
+    """
+    match faction:
+        case Faction.IMPERIALS:
+            return replace(unit_plan, power=unit_plan.power * 1.5)
+        case Faction.PERSISTENT:
+            return replace(unit_plan, max_health=unit_plan.max_health * 1.5, power=unit_plan.power * 0.75)
+        case Faction.EXPLORERS:
+            return replace(unit_plan, total_stamina=round(1.5 * unit_plan.total_stamina),
+                           max_health=unit_plan.max_health * 0.75)
+    return unit_plan
+
 
+def adjust_blessing(blessing: Blessing, faction: Faction) -> Blessing:
+    """
+    Apply the given faction's blessing modifiers to a blessing.
+    :param blessing: The blessing to adjust.
+    :param faction: The faction to adjust the blessing for.
+    :return: A new Blessing with the modifiers applied, or the given one if the faction has no blessing modifiers.
+    """
+    if faction is Faction.GODLESS:
+        return replace(blessing, cost=blessing.cost * 1.5)
+    return blessing
+
+
+# The unit plans and blessings for each faction, with their modifiers applied, sorted by cost. These are shared between
+# all players of the faction, so they must not be modified. Units get their own copy of their plan when recruited.
+FACTION_UNIT_PLANS: typing.Dict[Faction, typing.Tuple[UnitPlan, ...]] = \
+    {faction: tuple(sorted((adjust_unit_plan(up, faction) for up in UNIT_PLANS), key=lambda up: up.cost))
+     for faction in Faction}
+FACTION_BLESSINGS: typing.Dict[Faction, typing.Tuple[Blessing, ...]] = \
+    {faction: tuple(sorted((adjust_blessing(bls, faction) for bls in BLESSINGS.values()), key=lambda b: b.cost))
+     for faction in Faction}
+# Indexes of the above for each faction, keyed by name, so that loaded games can be given their factions' versions.
+FACTION_UNIT_PLANS_BY_NAME: typing.Dict[Faction, typing.Dict[str, UnitPlan]] = \
+    {faction: {up.name: up for up in unit_plans} for faction, unit_plans in FACTION_UNIT_PLANS.items()}
+FACTION_BLESSINGS_BY_NAME: typing.Dict[Faction, typing.Dict[str, Blessing]] = \
+    {faction: {bls.name: bls for bls in blessings} for faction, blessings in FACTION_BLESSINGS.items()}
+
+
+# The colours of each faction. These are pyxel's palette indices, written out so that the catalogue, and the game rules
+# that depend on it, can be used without pyxel.
 FACTION_COLOURS: typing.Dict[Faction, int] = {
-    Faction.AGRICULTURISTS: pyxel.COLOR_GREEN,
-    Faction.CAPITALISTS: pyxel.COLOR_YELLOW,
-    Faction.SCRUTINEERS: pyxel.COLOR_LIGHT_BLUE,
-    Faction.GODLESS: pyxel.COLOR_CYAN,
-    Faction.RAVENOUS: pyxel.COLOR_LIME,
-    Faction.FUNDAMENTALISTS: pyxel.COLOR_ORANGE,
-    Faction.ORTHODOX: pyxel.COLOR_PURPLE,
-    Faction.CONCENTRATED: pyxel.COLOR_GRAY,
-    Faction.FRONTIERSMEN: pyxel.COLOR_PEACH,
-    Faction.IMPERIALS: pyxel.COLOR_DARK_BLUE,
-    Faction.PERSISTENT: pyxel.COLOR_RED,
-    Faction.EXPLORERS: pyxel.COLOR_PINK,
-    Faction.INFIDELS: pyxel.COLOR_BROWN,
-    Faction.NOCTURNE: pyxel.COLOR_NAVY
+    Faction.AGRICULTURISTS: 3,  # pyxel.COLOR_GREEN
+    Faction.CAPITALISTS: 10,  # pyxel.COLOR_YELLOW
+    Faction.SCRUTINEERS: 6,  # pyxel.COLOR_LIGHT_BLUE
+    Faction.GODLESS: 12,  # pyxel.COLOR_CYAN
+    Faction.RAVENOUS: 11,  # pyxel.COLOR_LIME
+    Faction.FUNDAMENTALISTS: 9,  # pyxel.COLOR_ORANGE
+    Faction.ORTHODOX: 2,  # pyxel.COLOR_PURPLE
+    Faction.CONCENTRATED: 13,  # pyxel.COLOR_GRAY
+    Faction.FRONTIERSMEN: 15,  # pyxel.COLOR_PEACH
+    Faction.IMPERIALS: 5,  # pyxel.COLOR_DARK_BLUE
+    Faction.PERSISTENT: 8,  # pyxel.COLOR_RED
+    Faction.EXPLORERS: 14,  # pyxel.COLOR_PINK
+    Faction.INFIDELS: 4,  # pyxel.COLOR_BROWN
+    Faction.NOCTURNE: 1  # pyxel.COLOR_NAVY
 }
 
 
@@ -276,8 +342,9 @@ def get_available_unit_plans(player: Player, setl_lvl: int) -> typing.List[UnitP
     :return: A list of available units.
     """
     unit_plans = []
-    completed_blessing_names = list(map(lambda blessing: blessing.name, player.blessings))
-    for unit_plan in deepcopy(UNIT_PLANS):
+    completed_blessing_names = {blessing.name for blessing in player.blessings}
+    # The faction's plans are already adjusted and sorted by cost, so they only need to be filtered.
+    for unit_plan in FACTION_UNIT_PLANS[player.faction]:
         # A unit plan is available if the unit plan's pre-requisite has been satisfied, or it is non-existent.
         if unit_plan.prereq is None or unit_plan.prereq.name in completed_blessing_names:
             # Note that settlers can only be recruited in settlements of at least level 2. Additionally, users of The
@@ -287,22 +354,6 @@ def get_available_unit_plans(player: Player, setl_lvl: int) -> typing.List[UnitP
             # Once frontier settlements reach level 5, they can only construct settler units, and no improvements.
             elif not unit_plan.can_settle and not (player.faction is Faction.FRONTIERSMEN and setl_lvl >= 5):
                 unit_plans.append(unit_plan)
-
-    match player.faction:
-        case Faction.IMPERIALS:
-            for unit_plan in unit_plans:
-                unit_plan.power *= 1.5
-        case Faction.PERSISTENT:
-            for unit_plan in unit_plans:
-                unit_plan.max_health *= 1.5
-                unit_plan.power *= 0.75
-        case Faction.EXPLORERS:
-            for unit_plan in unit_plans:
-                unit_plan.total_stamina = round(1.5 * unit_plan.total_stamina)
-                unit_plan.max_health *= 0.75
-
-    # Sort unit plans by cost.
-    unit_plans.sort(key=lambda up: up.cost)
     return unit_plans
 
 
@@ -312,16 +363,9 @@ def get_available_blessings(player: Player) -> typing.List[Blessing]:
     :param player: The player viewing the available blessings.
     :return: A list of available blessings.
     """
-    completed_blessing_names = list(map(lambda blessing: blessing.name, player.blessings))
-    blessings = [bls for bls in deepcopy(BLESSINGS).values() if bls.name not in completed_blessing_names]
-
-    if player.faction is Faction.GODLESS:
-        for bls in blessings:
-            bls.cost *= 1.5
-
-    # Sort blessings by cost.
-    blessings.sort(key=lambda b: b.cost)
-    return blessings
+    completed_blessing_names = {blessing.name for blessing in player.blessings}
+    # The faction's blessings are already adjusted and sorted by cost, so they only need to be filtered.
+    return [bls for bls in FACTION_BLESSINGS[player.faction] if bls.name not in completed_blessing_names]
 
 
 def get_all_unlockable(blessing: Blessing) -> typing.List[Improvement | UnitPlan]:
@@ -330,9 +374,7 @@ def get_all_unlockable(blessing: Blessing) -> typing.List[Improvement | UnitPlan
     :param blessing: The blessing to search pre-requisites for.
     :return: A list of unlockable improvements and unit plans.
     """
-    unlockable = [imp for imp in IMPROVEMENTS if (imp.prereq is not None) and (imp.prereq.name == blessing.name)]
-    unlockable.extend([up for up in UNIT_PLANS if (up.prereq is not None) and (up.prereq.name == blessing.name)])
-    return unlockable
+    return get_unlockable_improvements(blessing) + get_unlockable_units(blessing)
 
 
 def get_unlockable_improvements(blessing: Blessing) -> typing.List[Improvement]:
@@ -341,7 +383,8 @@ def get_unlockable_improvements(blessing: Blessing) -> typing.List[Improvement]:
     :param blessing: The blessing to search pre-requisites for.
     :return: A list of unlockable improvements.
     """
-    return [imp for imp in IMPROVEMENTS if (imp.prereq is not None) and (imp.prereq.name == blessing.name)]
+    # A copy is returned so that callers can't modify the index.
+    return list(UNLOCKABLE_IMPROVEMENTS.get(blessing.name, []))
 
 
 def get_unlockable_units(blessing: Blessing) -> typing.List[UnitPlan]:
@@ -350,7 +393,8 @@ def get_unlockable_units(blessing: Blessing) -> typing.List[UnitPlan]:
     :param blessing: The blessing to search pre-requisites for.
     :return: A list of unlockable unit plans.
     """
-    return [up for up in UNIT_PLANS if (up.prereq is not None) and (up.prereq.name == blessing.name)]
+    # A copy is returned so that callers can't modify the index.
+    return list(UNLOCKABLE_UNITS.get(blessing.name, []))
 
 
 def get_improvement(name: str) -> Improvement:
@@ -359,7 +403,7 @@ def get_improvement(name: str) -> Improvement:
     :param name: The name of the improvement.
     :return: The Improvement with the given name.
     """
-    return next(imp for imp in IMPROVEMENTS if imp.name == name)
+    return IMPROVEMENTS_BY_NAME[name]
 
 
 def get_project(name: str) -> Project:
@@ -368,22 +412,26 @@ def get_project(name: str) -> Project:
     :param name: The name of the project.
     :return: The Project with the given name.
     """
-    return next(prj for prj in PROJECTS if prj.name == name)
+    return PROJECTS_BY_NAME[name]
 
 
-def get_blessing(name: str) -> Blessing:
+def get_blessing(name: str, faction: typing.Optional[Faction] = None) -> Blessing:
     """
     Get the blessing with the given name. Used when loading games.
     :param name: The name of the blessing.
+    :param faction: The faction to get the blessing for, with its modifiers applied. If not supplied, the unmodified
+    blessing is returned.
     :return: The Blessing with the given name.
     """
-    return next(bls for bls in BLESSINGS.values() if bls.name == name)
+    return BLESSINGS_BY_NAME[name] if faction is None else FACTION_BLESSINGS_BY_NAME[faction][name]
 
 
-def get_unit_plan(name: str) -> UnitPlan:
+def get_unit_plan(name: str, faction: typing.Optional[Faction] = None) -> UnitPlan:
     """
     Get the unit plan with the given name. Used when loading games.
     :param name: The name of the unit plan.
+    :param faction: The faction to get the unit plan for, with its modifiers applied. If not supplied, the unmodified
+    unit plan is returned.
     :return: The UnitPlan with the given name.
     """
-    return next(up for up in UNIT_PLANS if up.name == name)
+    return UNIT_PLANS_BY_NAME[name] if faction is None else FACTION_UNIT_PLANS_BY_NAME[faction][name]
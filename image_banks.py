@@ -0,0 +1,37 @@
+import typing
+
+import pyxel
+
+# The image banks that the game's images are kept in once loaded. Everything drawn during the game comes from these
+# two banks, so nothing needs to be loaded from disk while the game is running.
+SPRITES_BANK = 0
+QUADS_BANK = 1
+# The menu backgrounds are too large to share the banks, so each is kept in its own image. Each file holds three
+# backgrounds, one in each of its image banks.
+BACKGROUND_FILES = ["resources/background.pyxres", "resources/background2.pyxres"]
+BACKGROUND_SIZE = 200
+# The size of each image bank.
+BANK_SIZE = 256
+
+
+def load_images() -> typing.List[pyxel.Image]:
+    """
+    Load all of the game's images from their resource files. Must be called once, after pyxel has been initialised and
+    before anything is drawn.
+    :return: The menu backgrounds.
+    """
+    backgrounds = []
+    for background_file in BACKGROUND_FILES:
+        pyxel.load(background_file)
+        for bank in range(3):
+            background = pyxel.Image(BACKGROUND_SIZE, BACKGROUND_SIZE)
+            background.blt(0, 0, pyxel.image(bank), 0, 0, BACKGROUND_SIZE, BACKGROUND_SIZE)
+            backgrounds.append(background)
+    # The quads and sprites are both stored in the first bank of their files, so the quads are set aside while the
+    # sprites are loaded, and then moved to their own bank.
+    pyxel.load("resources/quads.pyxres")
+    quads = pyxel.Image(BANK_SIZE, BANK_SIZE)
+    quads.blt(0, 0, pyxel.image(0), 0, 0, BANK_SIZE, BANK_SIZE)
+    pyxel.load("resources/sprites.pyxres")
+    pyxel.image(QUADS_BANK).blt(0, 0, quads, 0, 0, BANK_SIZE, BANK_SIZE)
+    return backgrounds
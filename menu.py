@@ -6,7 +6,10 @@ import pyxel
 
 from calculator import clamp
 from catalogue import BLESSINGS, get_unlockable_improvements, IMPROVEMENTS, UNIT_PLANS, FACTION_COLOURS, PROJECTS
-from models import GameConfig, VictoryType, Faction, ProjectType
+from models import GameConfig, VictoryType, Faction, ProjectType, SaveMetadata
+
+# The map sizes that can be chosen from on the game setup screen, as width and height.
+MAP_SIZES: typing.List[typing.Tuple[int, int]] = [(100, 90), (200, 180), (300, 270), (500, 500)]
 
 
 class MenuOption(Enum):
@@ -28,6 +31,7 @@ class SetupOption(Enum):
     BIOME_CLUSTERING = "BIOME"
     FOG_OF_WAR = "FOG"
     CLIMATIC_EFFECTS = "CLIMATE"
+    MAP_SIZE = "MAP"
     START_GAME = "START"
 
 
@@ -48,13 +52,14 @@ class Menu:
     """
     The class responsible for drawing and navigating the menu.
     """
-    def __init__(self):
+    def __init__(self, backgrounds: typing.List[pyxel.Image]):
         """
         Initialise the menu with a random background image on the main menu.
+        :param backgrounds: The loaded background images to choose from.
         """
         self.menu_option = MenuOption.NEW_GAME
-        random.seed()
-        self.image = random.randint(0, 5)
+        self.backgrounds = backgrounds
+        self.image = random.randint(0, len(backgrounds) - 1)
         self.in_game_setup = False
         self.loading_game = False
         self.in_wiki = False
@@ -65,13 +70,18 @@ class Menu:
         self.improvement_boundaries = 0, 3
         self.unit_boundaries = 0, 9
         self.saves: typing.List[str] = []
+        # The indexed details of each save, if there are any.
+        self.save_details: typing.List[typing.Optional[SaveMetadata]] = []
         self.save_idx: typing.Optional[int] = 0
+        # The index of the last save that could not be loaded, if there is one.
+        self.load_failed_idx: typing.Optional[int] = None
         self.setup_option = SetupOption.PLAYER_FACTION
         self.faction_idx = 0
         self.player_count = 2
         self.biome_clustering_enabled = True
         self.fog_of_war_enabled = True
         self.climatic_effects_enabled = True
+        self.map_size_idx = 0
         self.showing_night = False
         self.faction_colours: typing.List[typing.Tuple[Faction, int]] = list(FACTION_COLOURS.items())
         self.showing_faction_details = False
@@ -83,12 +93,7 @@ class Menu:
         Draws the menu, based on where we are in it.
         """
         # Draw the background.
-        if self.image < 3:
-            pyxel.load("resources/background.pyxres")
-            pyxel.blt(0, 0, self.image, 0, 0, 200, 200)
-        else:
-            pyxel.load("resources/background2.pyxres")
-            pyxel.blt(0, 0, self.image - 3, 0, 0, 200, 200)
+        pyxel.blt(0, 0, self.backgrounds[self.image], 0, 0, 200, 200)
         if self.in_game_setup:
             pyxel.rectb(20, 20, 160, 154, pyxel.COLOR_WHITE)
             pyxel.rect(21, 21, 158, 152, pyxel.COLOR_BLACK)
@@ -116,30 +121,39 @@ class Menu:
                 case _:
                     pyxel.text(130, 65, f"<- {self.player_count} ->", pyxel.COLOR_WHITE)
 
-            pyxel.text(28, 85, "Biome Clustering",
+            pyxel.text(28, 80, "Biome Clustering",
                        pyxel.COLOR_RED if self.setup_option is SetupOption.BIOME_CLUSTERING else pyxel.COLOR_WHITE)
             if self.biome_clustering_enabled:
-                pyxel.text(125, 85, "<- Enabled", pyxel.COLOR_GREEN)
+                pyxel.text(125, 80, "<- Enabled", pyxel.COLOR_GREEN)
             else:
-                pyxel.text(125, 85, "Disabled ->", pyxel.COLOR_RED)
-            pyxel.text(28, 105, "Fog of War",
+                pyxel.text(125, 80, "Disabled ->", pyxel.COLOR_RED)
+            pyxel.text(28, 95, "Fog of War",
                        pyxel.COLOR_RED if self.setup_option is SetupOption.FOG_OF_WAR else pyxel.COLOR_WHITE)
             if self.fog_of_war_enabled:
-                pyxel.text(125, 105, "<- Enabled", pyxel.COLOR_GREEN)
+                pyxel.text(125, 95, "<- Enabled", pyxel.COLOR_GREEN)
             else:
-                pyxel.text(125, 105, "Disabled ->", pyxel.COLOR_RED)
-            pyxel.text(28, 125, "Climatic Effects",
+                pyxel.text(125, 95, "Disabled ->", pyxel.COLOR_RED)
+            pyxel.text(28, 110, "Climatic Effects",
                        pyxel.COLOR_RED if self.setup_option is SetupOption.CLIMATIC_EFFECTS else pyxel.COLOR_WHITE)
             if self.climatic_effects_enabled:
-                pyxel.text(125, 125, "<- Enabled", pyxel.COLOR_GREEN)
+                pyxel.text(125, 110, "<- Enabled", pyxel.COLOR_GREEN)
+            else:
+                pyxel.text(125, 110, "Disabled ->", pyxel.COLOR_RED)
+            pyxel.text(28, 125, "Map Size",
+                       pyxel.COLOR_RED if self.setup_option is SetupOption.MAP_SIZE else pyxel.COLOR_WHITE)
+            map_width, map_height = MAP_SIZES[self.map_size_idx]
+            map_size = f"{map_width}x{map_height}"
+            if self.map_size_idx == 0:
+                pyxel.text(125, 125, f"{map_size} ->", pyxel.COLOR_WHITE)
+            elif self.map_size_idx == len(MAP_SIZES) - 1:
+                pyxel.text(125, 125, f"<- {map_size}", pyxel.COLOR_WHITE)
             else:
-                pyxel.text(125, 125, "Disabled ->", pyxel.COLOR_RED)
+                pyxel.text(125, 125, f"<- {map_size} ->", pyxel.COLOR_WHITE)
             pyxel.text(81, 150, "Start Game",
                        pyxel.COLOR_RED if self.setup_option is SetupOption.START_GAME else pyxel.COLOR_WHITE)
             pyxel.text(52, 160, "(Press SPACE to go back)", pyxel.COLOR_WHITE)
 
             if self.showing_faction_details:
-                pyxel.load("resources/sprites.pyxres")
                 pyxel.rectb(30, 30, 140, 124, pyxel.COLOR_WHITE)
                 pyxel.rect(31, 31, 138, 122, pyxel.COLOR_BLACK)
                 pyxel.text(70, 35, "Faction Details", pyxel.COLOR_WHITE)
@@ -214,7 +228,6 @@ class Menu:
                     pyxel.blt(148, 138, 0, (self.faction_idx + 1) * 8, 92, 8, 8)
                     pyxel.text(158, 140, "->", pyxel.COLOR_WHITE)
         elif self.loading_game:
-            pyxel.load("resources/sprites.pyxres")
             pyxel.rectb(20, 20, 160, 144, pyxel.COLOR_WHITE)
             pyxel.rect(21, 21, 158, 142, pyxel.COLOR_BLACK)
             pyxel.text(81, 25, "Load Game", pyxel.COLOR_WHITE)
@@ -227,11 +240,21 @@ class Menu:
                 pyxel.text(147, 135, "More", pyxel.COLOR_WHITE)
                 pyxel.text(147, 141, "down!", pyxel.COLOR_WHITE)
                 pyxel.blt(167, 136, 0, 0, 76, 8, 8)
+            # Show the details of the selected save, if it has been indexed, or why it couldn't be loaded.
+            if self.save_idx is not None and self.save_idx == self.load_failed_idx:
+                pyxel.text(25, 135, "This save could not be loaded.", pyxel.COLOR_RED)
+            elif self.save_idx is not None and 0 <= self.save_idx < len(self.save_details) and \
+                    (details := self.save_details[self.save_idx]) is not None:
+                pyxel.text(25, 135, f"{details.player_faction.value}, turn {details.turn}", pyxel.COLOR_WHITE)
+                players_text = f"{details.player_count} players"
+                if details.imminent_victories:
+                    pyxel.text(25, 141, f"{players_text}, close to victory!", pyxel.COLOR_YELLOW)
+                else:
+                    pyxel.text(25, 141, players_text, pyxel.COLOR_WHITE)
             pyxel.text(56, 152, "Press SPACE to go back", pyxel.COLOR_WHITE)
         elif self.in_wiki:
             match self.wiki_showing:
                 case WikiOption.VICTORIES:
-                    pyxel.load("resources/sprites.pyxres")
                     pyxel.rectb(20, 20, 160, 144, pyxel.COLOR_WHITE)
                     pyxel.rect(21, 21, 158, 142, pyxel.COLOR_BLACK)
                     pyxel.text(82, 30, "Victories", pyxel.COLOR_WHITE)
@@ -352,7 +375,6 @@ class Menu:
                             pyxel.text(25, 152, "<-", pyxel.COLOR_WHITE)
                             pyxel.blt(35, 150, 0, 16, 44, 8, 8)
                 case WikiOption.FACTIONS:
-                    pyxel.load("resources/sprites.pyxres")
                     pyxel.rectb(20, 10, 160, 184, pyxel.COLOR_WHITE)
                     pyxel.rect(21, 11, 158, 182, pyxel.COLOR_BLACK)
                     pyxel.text(85, 15, "Factions", pyxel.COLOR_WHITE)
@@ -620,7 +642,6 @@ class Menu:
                             pyxel.text(25, 150, "- Units weakened during the day", pyxel.COLOR_RED)
                             pyxel.text(25, 170, "ELIMINATION", pyxel.COLOR_RED)
                 case WikiOption.CLIMATE:
-                    pyxel.load("resources/sprites.pyxres")
                     pyxel.rectb(20, 10, 160, 164, pyxel.COLOR_WHITE)
                     pyxel.rect(21, 11, 158, 162, pyxel.COLOR_BLACK)
                     pyxel.text(86, 15, "Climate", pyxel.COLOR_WHITE)
@@ -667,7 +688,6 @@ class Menu:
                         pyxel.blt(158, 161, 0, 8, 84, 8, 8)
                         pyxel.text(168, 162, "->", pyxel.COLOR_WHITE)
                 case WikiOption.BLESSINGS:
-                    pyxel.load("resources/sprites.pyxres")
                     pyxel.rectb(10, 20, 180, 154, pyxel.COLOR_WHITE)
                     pyxel.rect(11, 21, 178, 152, pyxel.COLOR_BLACK)
                     pyxel.text(82, 30, "Blessings", pyxel.COLOR_PURPLE)
@@ -698,7 +718,6 @@ class Menu:
                         pyxel.text(152, 161, "down!", pyxel.COLOR_WHITE)
                         pyxel.blt(172, 156, 0, 0, 76, 8, 8)
                 case WikiOption.IMPROVEMENTS:
-                    pyxel.load("resources/sprites.pyxres")
                     pyxel.rectb(10, 20, 180, 154, pyxel.COLOR_WHITE)
                     pyxel.rect(11, 21, 178, 152, pyxel.COLOR_BLACK)
                     pyxel.text(78, 30, "Improvements", pyxel.COLOR_ORANGE)
@@ -750,7 +769,6 @@ class Menu:
                         pyxel.text(152, 161, "down!", pyxel.COLOR_WHITE)
                         pyxel.blt(172, 156, 0, 0, 76, 8, 8)
                 case WikiOption.PROJECTS:
-                    pyxel.load("resources/sprites.pyxres")
                     pyxel.rectb(10, 20, 180, 154, pyxel.COLOR_WHITE)
                     pyxel.rect(11, 21, 178, 152, pyxel.COLOR_BLACK)
                     pyxel.text(86, 30, "Projects", pyxel.COLOR_WHITE)
@@ -769,7 +787,6 @@ class Menu:
                                 pyxel.blt(166, 50 + idx * 30, 0, 24, 44, 8, 8)
                     pyxel.text(56, 162, "Press SPACE to go back", pyxel.COLOR_WHITE)
                 case WikiOption.UNITS:
-                    pyxel.load("resources/sprites.pyxres")
                     pyxel.rectb(10, 20, 180, 154, pyxel.COLOR_WHITE)
                     pyxel.rect(11, 21, 178, 152, pyxel.COLOR_BLACK)
                     pyxel.text(90, 30, "Units", pyxel.COLOR_WHITE)
@@ -845,6 +862,8 @@ class Menu:
                     case SetupOption.FOG_OF_WAR:
                         self.setup_option = SetupOption.CLIMATIC_EFFECTS
                     case SetupOption.CLIMATIC_EFFECTS:
+                        self.setup_option = SetupOption.MAP_SIZE
+                    case SetupOption.MAP_SIZE:
                         self.setup_option = SetupOption.START_GAME
             elif self.loading_game:
                 if self.save_idx == self.load_game_boundaries[1] and self.save_idx < len(self.saves) - 1:
@@ -899,8 +918,10 @@ class Menu:
                         self.setup_option = SetupOption.BIOME_CLUSTERING
                     case SetupOption.CLIMATIC_EFFECTS:
                         self.setup_option = SetupOption.FOG_OF_WAR
-                    case SetupOption.START_GAME:
+                    case SetupOption.MAP_SIZE:
                         self.setup_option = SetupOption.CLIMATIC_EFFECTS
+                    case SetupOption.START_GAME:
+                        self.setup_option = SetupOption.MAP_SIZE
             elif self.loading_game:
                 if self.save_idx > 0 and self.save_idx == self.load_game_boundaries[0]:
                     self.load_game_boundaries = self.load_game_boundaries[0] - 1, self.load_game_boundaries[1] - 1
@@ -955,6 +976,8 @@ class Menu:
                         self.fog_of_war_enabled = False
                     case SetupOption.CLIMATIC_EFFECTS:
                         self.climatic_effects_enabled = False
+                    case SetupOption.MAP_SIZE:
+                        self.map_size_idx = max(0, self.map_size_idx - 1)
             elif self.in_wiki and self.wiki_showing is WikiOption.VICTORIES:
                 match self.victory_type:
                     case VictoryType.JUBILATION:
@@ -984,6 +1007,8 @@ class Menu:
                         self.fog_of_war_enabled = True
                     case SetupOption.CLIMATIC_EFFECTS:
                         self.climatic_effects_enabled = True
+                    case SetupOption.MAP_SIZE:
+                        self.map_size_idx = min(len(MAP_SIZES) - 1, self.map_size_idx + 1)
             elif self.in_wiki and self.wiki_showing is WikiOption.VICTORIES:
                 match self.victory_type:
                     case VictoryType.ELIMINATION:
@@ -1008,4 +1033,5 @@ class Menu:
         :return: The appropriate GameConfig object.
         """
         return GameConfig(self.player_count, self.faction_colours[self.faction_idx][0], self.biome_clustering_enabled,
-                          self.fog_of_war_enabled, self.climatic_effects_enabled)
+                          self.fog_of_war_enabled, self.climatic_effects_enabled,
+                          map_width=MAP_SIZES[self.map_size_idx][0], map_height=MAP_SIZES[self.map_size_idx][1])
@@ -1,7 +1,11 @@
+import base64
 import typing
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from enum import Enum
 
+import numpy as np
+
 
 class Biome(str, Enum):
     """
@@ -179,18 +183,147 @@ class ConstructionMenu(Enum):
     UNITS = "UNITS"
 
 
-@dataclass
-class Quad:
+# The biomes in the order of their indices in QuadGrid.biomes.
+BIOMES: typing.List[Biome] = list(Biome)
+
+
+class EntityIds:
     """
-    A quad on the board. Has a biome, yield, and whether it is selected.
+    Allocates the IDs of units, heathens, settlements, and players. Each entity keeps its ID for its whole lifetime,
+    including across saves, so that saves can refer to shared entities by ID rather than copying them. Entities are
+    compared by identity rather than by their fields, as two units with the same health and location are still two
+    different units.
     """
-    biome: Biome
-    wealth: float
-    harvest: float
-    zeal: float
-    fortune: float
-    selected: bool = False
-    is_relic: bool = False
+
+    def __init__(self):
+        """
+        Initialise the allocator, starting from the first ID.
+        """
+        self.next_id = 1
+
+    def allocate(self) -> int:
+        """
+        Allocate a new ID.
+        :return: An ID that no other entity has.
+        """
+        entity_id = self.next_id
+        self.next_id += 1
+        return entity_id
+
+    def reserve(self, entity_id: int):
+        """
+        Ensure that the given ID, e.g. one loaded from a save, is never allocated to another entity.
+        :param entity_id: The ID to reserve.
+        """
+        self.next_id = max(self.next_id, entity_id + 1)
+
+
+# The allocator for every entity in the process.
+ENTITY_IDS = EntityIds()
+
+
+def entity_id_field() -> typing.Any:
+    """
+    Declare the ID field of an entity data class. Entities are given a new ID when they are created, unless one is
+    supplied.
+    :return: The field.
+    """
+    return field(default_factory=ENTITY_IDS.allocate)
+
+
+class Quad:
+    """
+    A quad on the board. Has a biome, yield, and whether it is selected. Quads do not hold this data themselves, but are
+    instead lightweight views onto a location in a QuadGrid, which holds the data for the whole board.
+    """
+    __slots__ = ("grid", "x", "y")
+
+    def __init__(self, grid, x: int, y: int):
+        """
+        Initialise the view.
+        :param grid: The QuadGrid that holds the quad's data.
+        :param x: The column of the quad.
+        :param y: The row of the quad.
+        """
+        self.grid = grid
+        self.x = x
+        self.y = y
+
+    @property
+    def biome(self) -> Biome:
+        """
+        The biome of the quad.
+        """
+        return BIOMES[self.grid.biomes[self.y, self.x]]
+
+    @property
+    def wealth(self) -> float:
+        """
+        The wealth yield of the quad.
+        """
+        return float(self.grid.yields[self.y, self.x, 0])
+
+    @property
+    def harvest(self) -> float:
+        """
+        The harvest yield of the quad.
+        """
+        return float(self.grid.yields[self.y, self.x, 1])
+
+    @property
+    def zeal(self) -> float:
+        """
+        The zeal yield of the quad.
+        """
+        return float(self.grid.yields[self.y, self.x, 2])
+
+    @property
+    def fortune(self) -> float:
+        """
+        The fortune yield of the quad.
+        """
+        return float(self.grid.yields[self.y, self.x, 3])
+
+    @property
+    def selected(self) -> bool:
+        """
+        Whether the quad is selected by the player.
+        """
+        return bool(self.grid.selected[self.y, self.x])
+
+    @selected.setter
+    def selected(self, selected: bool):
+        self.grid.selected[self.y, self.x] = selected
+
+    @property
+    def is_relic(self) -> bool:
+        """
+        Whether the quad contains a relic.
+        """
+        return bool(self.grid.relics[self.y, self.x])
+
+    @is_relic.setter
+    def is_relic(self, is_relic: bool):
+        self.grid.relics[self.y, self.x] = is_relic
+
+    def __eq__(self, other) -> bool:
+        # Two views are equal if they point to the same quad.
+        return isinstance(other, Quad) and self.grid is other.grid and self.x == other.x and self.y == other.y
+
+    def __hash__(self) -> int:
+        return hash((id(self.grid), self.x, self.y))
+
+    def __repr__(self) -> str:
+        return f"Quad({self.biome.value}, ({self.x}, {self.y}), wealth={self.wealth:.2f}, " \
+               f"harvest={self.harvest:.2f}, zeal={self.zeal:.2f}, fortune={self.fortune:.2f})"
+
+    def as_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Get the quad's data in the same form as it would be if quads were data classes. Used when saving games.
+        :return: A dictionary of the quad's biome, yield, selection, and relic status.
+        """
+        return {"biome": self.biome, "wealth": self.wealth, "harvest": self.harvest, "zeal": self.zeal,
+                "fortune": self.fortune, "selected": self.selected, "is_relic": self.is_relic}
 
 
 @dataclass
@@ -253,7 +386,7 @@ class UnitPlan:
     can_settle: bool = False
 
 
-@dataclass
+@dataclass(eq=False)
 class Unit:
     """
     The actual instance of a unit, based on a UnitPlan.
@@ -265,9 +398,10 @@ class Unit:
     plan: UnitPlan
     has_attacked: bool = False  # Units can only attack once per turn.
     sieging: bool = False
+    entity_id: int = entity_id_field()
 
 
-@dataclass
+@dataclass(eq=False)
 class Heathen:
     """
     A roaming unit that doesn't belong to any player that will attack any unit it sees.
@@ -277,6 +411,7 @@ class Heathen:
     location: (float, float)
     plan: UnitPlan
     has_attacked: bool = False  # Heathens can also only attack once per turn.
+    entity_id: int = entity_id_field()
 
 
 @dataclass
@@ -297,7 +432,7 @@ class OngoingBlessing:
     fortune_consumed: float = 0.0
 
 
-@dataclass
+@dataclass(eq=False)
 class Settlement:
     """
     A settlement belonging to a player.
@@ -329,7 +464,13 @@ class Settlement:
     harvest_status: HarvestStatus = HarvestStatus.STANDARD
     economic_status: EconomicStatus = EconomicStatus.STANDARD
     produced_settler: bool = False  # Used for AI players so that settlements don't get stuck producing settlers.
-    under_siege_by: typing.Optional[Unit] = None
+    # Saved as a reference to the unit's ID, as the unit itself belongs to another player.
+    under_siege_by: typing.Optional[Unit] = field(default=None, metadata={"reference": True})
+    # The most recently calculated yield totals for the settlement, keyed on whether it is night and whether they are
+    # strict. See calculator.get_setl_totals(). Transient fields are not saved.
+    totals_cache: typing.Dict[typing.Tuple[bool, bool], tuple] = \
+        field(default_factory=dict, repr=False, metadata={"transient": True})
+    entity_id: int = entity_id_field()
 
 
 @dataclass
@@ -350,7 +491,57 @@ class AIPlaystyle:
     expansion: ExpansionPlaystyle
 
 
-@dataclass
+class VisibilityMask:
+    """
+    The quads that a player has seen, stored as a boolean mask over the board rather than as a set of coordinates, so
+    that it takes up the same space no matter how much of the board has been explored.
+    """
+    __slots__ = ("seen",)
+
+    def __init__(self, width: int = 100, height: int = 90, seen: typing.Optional[np.ndarray] = None):
+        """
+        Initialise the mask, with nothing seen unless a mask is supplied.
+        :param width: The width of the board.
+        :param height: The height of the board.
+        :param seen: The mask to use, indexed by row and then column, if we are loading a game.
+        """
+        self.seen: np.ndarray = np.zeros((height, width), dtype=bool) if seen is None else seen
+
+    def reveal(self, location: (int, int), radius: int):
+        """
+        Mark all quads within the given Chebyshev distance of a location as seen.
+        :param location: The centre of the square to reveal.
+        :param radius: The distance, in quads, to reveal in each direction.
+        """
+        self.seen[max(location[1] - radius, 0):max(location[1] + radius + 1, 0),
+                  max(location[0] - radius, 0):max(location[0] + radius + 1, 0)] = True
+
+    def __contains__(self, location: (int, int)) -> bool:
+        # Quads off the edge of the board are never seen.
+        return 0 <= location[1] < self.seen.shape[0] and 0 <= location[0] < self.seen.shape[1] and \
+            bool(self.seen[location[1], location[0]])
+
+    def pack(self) -> typing.Dict[str, typing.Any]:
+        """
+        Get the mask in a compact form suitable for saving, with each quad taking up a single bit.
+        :return: A dictionary of the mask's dimensions and its base64-encoded bits.
+        """
+        return {"width": self.seen.shape[1], "height": self.seen.shape[0],
+                "bits": base64.b64encode(np.packbits(self.seen).tobytes()).decode("ascii")}
+
+    @staticmethod
+    def unpack(packed: typing.Dict[str, typing.Any]) -> "VisibilityMask":
+        """
+        Recreate a mask from its packed form.
+        :param packed: The dictionary of width, height, and bits produced by pack().
+        :return: The unpacked mask.
+        """
+        width, height = packed["width"], packed["height"]
+        bits = np.unpackbits(np.frombuffer(base64.b64decode(packed["bits"]), dtype=np.uint8), count=width * height)
+        return VisibilityMask(seen=bits.astype(bool).reshape(height, width))
+
+
+@dataclass(eq=False)
 class Player:
     """
     A player of Microcosm.
@@ -362,13 +553,14 @@ class Player:
     settlements: typing.List[Settlement]
     units: typing.List[Unit]
     blessings: typing.List[Blessing]
-    quads_seen: typing.Set[typing.Tuple[int, int]]
+    quads_seen: VisibilityMask
     imminent_victories: typing.Set[VictoryType]
     ongoing_blessing: typing.Optional[OngoingBlessing] = None
     ai_playstyle: typing.Optional[AIPlaystyle] = None
     jubilation_ctr: int = 0  # How many turns the player has had 5 settlements at 100% satisfaction.
     accumulated_wealth: float = 0.0
     eliminated: bool = False
+    entity_id: int = entity_id_field()
 
 
 @dataclass
@@ -410,6 +602,10 @@ class GameConfig:
     biome_clustering: bool
     fog_of_war: bool
     climatic_effects: bool
+    seed: typing.Optional[int] = None  # If not supplied, a random seed is chosen when the game begins.
+    # The size of the map, in quads. Saves from before the map size could be chosen take the original size.
+    map_width: int = 100
+    map_height: int = 90
 
 
 @dataclass
@@ -419,3 +615,53 @@ class Victory:
     """
     player: Player
     type: VictoryType
+
+
+@dataclass
+class TournamentResult:
+    """
+    The result of a single AI-only game played out as part of a tournament.
+    """
+    cfg: GameConfig
+    factions: typing.List[Faction]
+    playstyles: typing.List[AIPlaystyle]
+    victory_type: typing.Optional[VictoryType]  # Will be None if the game reached the turn limit without a victory.
+    winner: typing.Optional[Faction]
+    turns: int
+    turn_times: typing.List[float]  # The wall time taken by each turn, in seconds.
+
+
+@dataclass
+class SaveMetadata:
+    """
+    The details of a save file, as recorded in the saves index, so that they can be displayed without reading the save.
+    """
+    file_name: str
+    size: int  # In bytes. Used with the modification time to tell whether the save has changed since it was indexed.
+    modified: float
+    turn: int
+    player_faction: Faction
+    player_count: int
+    imminent_victories: typing.List[VictoryType]  # The victories that the player is close to achieving.
+
+
+@dataclass
+class PhaseTimings:
+    """
+    The time spent in one phase of the game, e.g. drawing the board or processing the AI players, as measured by the
+    profiler.
+    """
+    calls: int = 0
+    total: float = 0  # In seconds.
+    longest: float = 0  # In seconds.
+    # The most recent durations, in seconds, which the profiling HUD summarises.
+    recent: typing.Deque[float] = field(default_factory=lambda: deque(maxlen=120))
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    The timings of a single benchmark, as run by the benchmark suite.
+    """
+    name: str
+    times: typing.List[float]  # The wall time taken by each repeat, in seconds.
@@ -1,4 +1,3 @@
-import random
 import typing
 
 from calculator import get_player_totals, get_setl_totals, attack, complete_construction, clamp, attack_setl, \
@@ -6,7 +5,11 @@ from calculator import get_player_totals, get_setl_totals, attack, complete_cons
 from catalogue import get_available_blessings, get_unlockable_improvements, get_unlockable_units, \
     get_available_improvements, get_available_unit_plans, Namer
 from models import Player, Blessing, AttackPlaystyle, OngoingBlessing, Settlement, Improvement, UnitPlan, \
-    Construction, Unit, ExpansionPlaystyle, Quad, GameConfig, Faction
+    Construction, Unit, ExpansionPlaystyle, GameConfig, Faction, Heathen
+from occupancy import OccupancyGrid
+from overlay import Overlay
+from quad_grid import QuadGrid
+from random_streams import RandomStreams
 
 
 def set_blessing(player: Player, player_totals: (float, float, float, float)):
@@ -227,27 +230,36 @@ class MoveMaker:
     """
     The MoveMaker class handles AI moves for each turn.
     """
-    def __init__(self, namer: Namer):
+    def __init__(self, namer: Namer, overlay: Overlay, occupancy: OccupancyGrid):
         """
-        Initialise the MoveMaker's Namer reference.
+        Initialise the MoveMaker's Namer, Overlay, and OccupancyGrid references.
         :param namer: The Namer instance to use for settlement names.
+        :param overlay: The Overlay to raise notifications on when the non-AI player is attacked or besieged.
+        :param occupancy: The OccupancyGrid to find nearby entities with, and to keep up to date as units move.
         """
         self.namer: Namer = namer
-        self.board_ref = None
+        self.overlay: Overlay = overlay
+        self.occupancy: OccupancyGrid = occupancy
 
-    def make_move(self, player: Player, all_players: typing.List[Player], quads: typing.List[typing.List[Quad]],
-                  cfg: GameConfig, is_night: bool):
+    def is_free(self, loc: (int, int)) -> bool:
+        """
+        Check whether an AI unit can move to the given location.
+        :param loc: The location to check.
+        :return: Whether there are no units or settlements at the location. Heathens do not block AI units.
+        """
+        return all(isinstance(occupant, Heathen) for occupant in self.occupancy.at(loc))
+
+    def make_move(self, player: Player, all_players: typing.List[Player], quads: QuadGrid,
+                  cfg: GameConfig, is_night: bool, rngs: RandomStreams):
         """
         Make a move for the given AI player.
         :param player: The AI player to make a move for.
         :param all_players: The list of all players.
-        :param quads: The 2D list of quads to use to search for relics.
+        :param quads: The grid of quads to use to search for relics.
         :param cfg: The game configuration.
         :param is_night: Whether it is night.
+        :param rngs: The game's random streams, used to move units, name settlements, and investigate relics.
         """
-        all_setls = []
-        for pl in all_players:
-            all_setls.extend(pl.settlements)
         player_totals = get_player_totals(player, is_night)
         if player.ongoing_blessing is None:
             set_blessing(player, player_totals)
@@ -273,6 +285,7 @@ class MoveMaker:
                         unit.garrisoned = False
                         unit.location = setl.location[0], setl.location[1] + 1
                         player.units.append(unit)
+                        self.occupancy.add(unit, player)
                         setl.garrison.remove(unit)
             # Deploy a unit from the garrison if the AI is not defensive, or the settlement is under siege or attack, or
             # there are too many units garrisoned.
@@ -283,41 +296,38 @@ class MoveMaker:
                 deployed.garrisoned = False
                 deployed.location = setl.location[0], setl.location[1] + 1
                 player.units.append(deployed)
-        all_units = []
-        for p in all_players:
-            if p is not player:
-                for unit in p.units:
-                    all_units.append(unit)
+                self.occupancy.add(deployed, player)
         min_pow_health: (float, Unit) = 9999, None  # 9999 is arbitrary, but no unit will ever have this.
         # Move each deployed unit, and also work out which of the player's units has the lowest combined power and
         # health. This is subsequently used if we need to sell units due to negative wealth.
         for unit in player.units:
             if pow_health := (unit.health + unit.plan.power) < min_pow_health[0]:
                 min_pow_health = pow_health, unit
-            self.move_unit(player, unit, all_units, all_players, all_setls, quads, cfg)
+            self.move_unit(player, unit, all_players, quads, cfg, rngs)
         if player.wealth + player_totals[0] < 0:
             player.wealth += min_pow_health[1].plan.cost
             player.units.remove(min_pow_health[1])
+            self.occupancy.remove(min_pow_health[1])
 
-    def move_unit(self, player: Player, unit: Unit, other_units: typing.List[Unit], all_players: typing.List[Player],
-                  all_setls: typing.List[Settlement], quads: typing.List[typing.List[Quad]], cfg: GameConfig):
+    def move_unit(self, player: Player, unit: Unit, all_players: typing.List[Player],
+                  quads: QuadGrid, cfg: GameConfig, rngs: RandomStreams):
         """
         Move the given unit, attacking if the right conditions are met.
         :param player: The AI owner of the unit being moved.
         :param unit: The unit being moved.
-        :param other_units: The list of all enemy units.
         :param all_players: The list of all players.
-        :param all_setls: The list of all settlements.
-        :param quads: The 2D list of quads to use to search for relics.
+        :param quads: The grid of quads to use to search for relics.
         :param cfg: The game configuration.
+        :param rngs: The game's random streams, used to move units, name settlements, and investigate relics.
         """
         # If the unit can settle, randomly move it until it is far enough away from any of the player's other
         # settlements. Once this has been achieved, found a new settlement and destroy the unit.
         if unit.plan.can_settle:
-            x_movement = random.randint(-unit.remaining_stamina, unit.remaining_stamina)
+            x_movement = rngs.ai.randint(-unit.remaining_stamina, unit.remaining_stamina)
             rem_movement = unit.remaining_stamina - abs(x_movement)
-            y_movement = random.choice([-rem_movement, rem_movement])
-            unit.location = clamp(unit.location[0] + x_movement, 0, 99), clamp(unit.location[1] + y_movement, 0, 89)
+            y_movement = rngs.ai.choice([-rem_movement, rem_movement])
+            self.occupancy.move(unit, (clamp(unit.location[0] + x_movement, 0, quads.width - 1),
+                                       clamp(unit.location[1] + y_movement, 0, quads.height - 1)))
             unit.remaining_stamina -= abs(x_movement) + abs(y_movement)
 
             far_enough = True
@@ -326,45 +336,47 @@ class MoveMaker:
                 if dist < 10:
                     far_enough = False
             if far_enough:
-                quad_biome = self.board_ref.quads[unit.location[1]][unit.location[0]].biome
-                setl_name = self.namer.get_settlement_name(quad_biome)
+                quad_biome = quads[unit.location[1]][unit.location[0]].biome
+                setl_name = self.namer.get_settlement_name(quad_biome, rngs.names)
                 new_settl = Settlement(setl_name, unit.location, [],
-                                       [self.board_ref.quads[unit.location[1]][unit.location[0]]], [])
+                                       [quads[unit.location[1]][unit.location[0]]], [])
                 if player.faction is Faction.FRONTIERSMEN:
                     new_settl.satisfaction = 75
                 elif player.faction is Faction.IMPERIALS:
                     new_settl.strength /= 2
                     new_settl.max_strength /= 2
                 player.settlements.append(new_settl)
+                self.occupancy.add(new_settl, player)
                 player.units.remove(unit)
+                self.occupancy.remove(unit)
         else:
             attack_over_siege = True  # If False, the unit will siege the settlement.
             within_range: typing.Optional[Unit | Settlement] = None
             # If the unit cannot settle, then we must first check if it meets the criteria to attack another unit. A
             # unit can attack if any of its settlements are under siege or attack, or if the AI is aggressive, or if the
             # AI is neutral but with a health advantage over another unit, or lastly, if the other unit is an Infidel.
-            for other_u in other_units:
-                is_infidel = False
-                for pl in all_players:
-                    if pl.faction is Faction.INFIDELS and other_u in pl.units:
-                        is_infidel = True
-                        break
+            # Only the entities within reach of the unit need to be considered.
+            nearby = self.occupancy.within(unit.location, unit.remaining_stamina)
+            for other_u in nearby:
+                if not isinstance(other_u, Unit):
+                    continue
+                other_owner = self.occupancy.owner_of(other_u)
+                if other_owner is player:
+                    continue
+                is_infidel = other_owner.faction is Faction.INFIDELS
                 could_attack: bool = any(setl.under_siege_by is not None or setl.strength < setl.max_strength / 2
                                          for setl in player.settlements) or \
                     player.ai_playstyle.attacking is AttackPlaystyle.AGGRESSIVE or \
                     (player.ai_playstyle.attacking is AttackPlaystyle.NEUTRAL and
                      unit.health >= other_u.health * 2) or is_infidel
-                # Of course, the attacked unit has to be close enough.
-                if max(abs(unit.location[0] - other_u.location[0]),
-                       abs(unit.location[1] - other_u.location[1])) <= unit.remaining_stamina and could_attack and \
-                        other_u is not unit:
+                if could_attack:
                     within_range = other_u
                     break
             if within_range is None:
                 # If there are no other units within range and attackable, then we check if there are any enemy
                 # settlements we can attack or place under siege.
-                for other_setl in all_setls:
-                    if other_setl not in player.settlements:
+                for other_setl in nearby:
+                    if isinstance(other_setl, Settlement) and self.occupancy.owner_of(other_setl) is not player:
                         # Settlements are only attacked by AI players under strict conditions. Even aggressive AIs need
                         # to double the strength of the settlement in their health.
                         could_attack: bool = (player.ai_playstyle.attacking is AttackPlaystyle.AGGRESSIVE and
@@ -374,23 +386,18 @@ class MoveMaker:
                                              (player.ai_playstyle.attacking is AttackPlaystyle.DEFENSIVE and
                                               other_setl.strength == 0)
                         if could_attack:
-                            if max(abs(unit.location[0] - other_setl.location[0]),
-                                   abs(unit.location[1] - other_setl.location[1])) <= unit.remaining_stamina:
-                                within_range = other_setl
-                                break
-                        else:
-                            # If there are no attackable settlements, we check if the AI player can place any under
-                            # siege. Aggressive AIs will place any settlement they can see under siege, and neutral AIs
-                            # will do the same if they have the upper hand.
-                            could_siege: bool = player.ai_playstyle.attacking is AttackPlaystyle.AGGRESSIVE or \
-                                                (player.ai_playstyle.attacking is AttackPlaystyle.NEUTRAL and
-                                                 unit.health >= other_setl.strength * 2)
-                            if could_siege:
-                                if max(abs(unit.location[0] - other_setl.location[0]),
-                                       abs(unit.location[1] - other_setl.location[1])) <= unit.remaining_stamina:
-                                    within_range = other_setl
-                                    attack_over_siege = False
-                                    break
+                            within_range = other_setl
+                            break
+                        # If there are no attackable settlements, we check if the AI player can place any under siege.
+                        # Aggressive AIs will place any settlement they can see under siege, and neutral AIs will do
+                        # the same if they have the upper hand.
+                        could_siege: bool = player.ai_playstyle.attacking is AttackPlaystyle.AGGRESSIVE or \
+                                            (player.ai_playstyle.attacking is AttackPlaystyle.NEUTRAL and
+                                             unit.health >= other_setl.strength * 2)
+                        if could_siege:
+                            within_range = other_setl
+                            attack_over_siege = False
+                            break
             if within_range is not None:
                 # Now that we have determined that there is some entity (unit or settlement) that our unit will attack,
                 # we need to work out where we will move our unit to. There are three options for this, directly to the
@@ -405,10 +412,8 @@ class MoveMaker:
                 found_valid_loc = False
                 # We have to ensure that no other units or settlements are in the location we intend to move to.
                 for loc in [first_resort, second_resort, third_resort]:
-                    if not any(u.location == loc for u in player.units) and \
-                            not any(other_u.location == loc for other_u in other_units) and \
-                            not any(setl.location == loc for setl in all_setls):
-                        unit.location = loc
+                    if self.is_free(loc):
+                        self.occupancy.move(unit, loc)
                         found_valid_loc = True
                         break
                 unit.remaining_stamina = 0
@@ -425,32 +430,35 @@ class MoveMaker:
                             data = attack(unit, within_range)
 
                             # Show the attack notification if we attacked the player.
-                            if within_range in all_players[0].units:
-                                self.board_ref.overlay.toggle_attack(data)
+                            other_owner = self.occupancy.owner_of(within_range)
+                            if other_owner is all_players[0]:
+                                self.overlay.toggle_attack(data)
                             if within_range.health <= 0:
-                                for p in all_players:
-                                    if within_range in p.units:
-                                        p.units.remove(within_range)
-                                        break
+                                other_owner.units.remove(within_range)
+                                self.occupancy.remove(within_range)
                             if unit.health <= 0:
                                 player.units.remove(unit)
+                                self.occupancy.remove(unit)
                         # Alternatively, we are attacking a settlement.
                         else:
-                            setl_owner = None
-                            for pl in all_players:
-                                if within_range in pl.settlements:
-                                    setl_owner = pl
+                            setl_owner = self.occupancy.owner_of(within_range)
                             data = attack_setl(unit, within_range, setl_owner)
 
                             # Show the settlement attack notification if we attacked the player.
-                            if within_range in all_players[0].settlements:
-                                self.board_ref.overlay.toggle_setl_attack(data)
+                            if setl_owner is all_players[0]:
+                                self.overlay.toggle_setl_attack(data)
                             if data.attacker_was_killed:
                                 player.units.remove(data.attacker)
+                                self.occupancy.remove(data.attacker)
                             elif data.setl_was_taken:
                                 data.settlement.under_siege_by = None
+                                # The Concentrated can only have a single settlement, so when they take others, the
+                                # settlements simply disappear.
                                 if player.faction is not Faction.CONCENTRATED:
                                     player.settlements.append(data.settlement)
+                                    self.occupancy.set_owner(data.settlement, player)
+                                else:
+                                    self.occupancy.remove(data.settlement)
                                 setl_owner.settlements.remove(data.settlement)
                     # If we have chosen to place a settlement under siege, and the unit is not already sieging another
                     # settlement, do so.
@@ -459,39 +467,36 @@ class MoveMaker:
                         if within_range.under_siege_by is None:
                             within_range.under_siege_by = unit
                             # Show the siege notification if we have placed one of the player's settlements under siege.
-                            if within_range in all_players[0].settlements:
-                                self.board_ref.overlay.toggle_siege_notif(within_range, player)
+                            if self.occupancy.owner_of(within_range) is all_players[0]:
+                                self.overlay.toggle_siege_notif(within_range, player)
             # If there's nothing within range, look for relics or just move randomly.
             else:
                 # The range in which a unit can investigate is actually further than its remaining stamina, as you only
                 # have to be next to a relic to investigate it.
                 investigate_range = unit.remaining_stamina + 1
-                for i in range(unit.location[1] - investigate_range, unit.location[1] + investigate_range + 1):
-                    for j in range(unit.location[0] - investigate_range, unit.location[0] + investigate_range + 1):
-                        if 0 <= i <= 89 and 0 <= j <= 99 and quads[i][j].is_relic:
-                            first_resort: (int, int)
-                            second_resort = j, i + 1
-                            third_resort = j, i - 1
-                            if j - unit.location[0] < 0:
-                                first_resort = j + 1, i
-                            else:
-                                first_resort = j - 1, i
-                            found_valid_loc = False
-                            for loc in [first_resort, second_resort, third_resort]:
-                                if not any(u.location == loc for u in player.units) and \
-                                        not any(other_u.location == loc for other_u in other_units) and \
-                                        not any(setl.location == loc for setl in all_setls):
-                                    unit.location = loc
-                                    found_valid_loc = True
-                                    break
-                            unit.remaining_stamina = 0
-                            if found_valid_loc:
-                                investigate_relic(player, unit, (j, i), cfg)
-                                quads[i][j].is_relic = False
-                                return
+                for j, i in quads.relics_within(unit.location, investigate_range):
+                    first_resort: (int, int)
+                    second_resort = j, i + 1
+                    third_resort = j, i - 1
+                    if j - unit.location[0] < 0:
+                        first_resort = j + 1, i
+                    else:
+                        first_resort = j - 1, i
+                    found_valid_loc = False
+                    for loc in [first_resort, second_resort, third_resort]:
+                        if self.is_free(loc):
+                            self.occupancy.move(unit, loc)
+                            found_valid_loc = True
+                            break
+                    unit.remaining_stamina = 0
+                    if found_valid_loc:
+                        investigate_relic(player, unit, (j, i), cfg, rngs.relics)
+                        quads[i][j].is_relic = False
+                        return
                 # We only get to this point if a valid relic was not found.
-                x_movement = random.randint(-unit.remaining_stamina, unit.remaining_stamina)
+                x_movement = rngs.ai.randint(-unit.remaining_stamina, unit.remaining_stamina)
                 rem_movement = unit.remaining_stamina - abs(x_movement)
-                y_movement = random.choice([-rem_movement, rem_movement])
-                unit.location = clamp(unit.location[0] + x_movement, 0, 99), clamp(unit.location[1] + y_movement, 0, 89)
+                y_movement = rngs.ai.choice([-rem_movement, rem_movement])
+                self.occupancy.move(unit, (clamp(unit.location[0] + x_movement, 0, quads.width - 1),
+                                           clamp(unit.location[1] + y_movement, 0, quads.height - 1)))
                 unit.remaining_stamina -= abs(x_movement) + abs(y_movement)
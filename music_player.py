@@ -15,7 +15,6 @@ class MusicPlayer:
         """
         self.menu_player: vlc.MediaPlayer = vlc.MediaPlayer("resources/audio/menu.aiff")
         self.menu_player.audio_set_volume(70)
-        random.seed()
         self.game_players: typing.List[vlc.MediaPlayer] = \
             [vlc.MediaPlayer(f"resources/audio/background{i}.aiff") for i in range(1, 9)]
         random.shuffle(self.game_players)
@@ -0,0 +1,155 @@
+import typing
+
+from models import Unit, Heathen, Settlement, Player
+
+Occupant = typing.Union[Unit, Heathen, Settlement]
+
+
+class OccupancyGrid:
+    """
+    An index of which deployed units, heathens, and settlements are on each quad, so that the entities at or near a
+    location can be found without scanning every entity in the game. Garrisoned units are not included, as they are
+    considered to be inside their settlement.
+    The grid also records the player that owns each deployed unit and settlement, so that owners can be found without
+    scanning every player's units and settlements. An entity is owned by a player exactly when it is in their units or
+    settlements.
+    The grid must be kept up to date, so every move, spawn, death, garrison, settle, and capture must go through it.
+    """
+
+    def __init__(self):
+        """
+        Initialise the empty grid. Occupants are keyed by location rather than stored in a fixed-size 2D list, because
+        units can briefly end up just off the edge of the map, e.g. when a heathen moves to attack a unit on the edge.
+        """
+        self.occupants: typing.Dict[typing.Tuple[int, int], typing.List[Occupant]] = {}
+        # The owner of each unit and settlement, keyed by entity ID. Heathens have no owner.
+        self.owners: typing.Dict[int, Player] = {}
+        # A version for each player, keyed by entity ID, and for the heathens, keyed by None. Each is incremented
+        # whenever one of its entities is added, moved, or removed, or changes hands, so that anything derived from the
+        # positions of a player's entities, e.g. the board's night vision, can tell when it needs to be recalculated.
+        # These are never reset, so that a version is never repeated.
+        self.versions: typing.Dict[typing.Optional[int], int] = {}
+
+    def rebuild(self, players: typing.List[Player], heathens: typing.List[Heathen]):
+        """
+        Rebuild the grid from scratch. Used when loading a game.
+        :param players: The players, whose deployed units and settlements will be added.
+        :param heathens: The heathens to add.
+        """
+        self.occupants = {}
+        self.owners = {}
+        for player in players:
+            for setl in player.settlements:
+                self.add(setl, player)
+            for unit in player.units:
+                self.add(unit, player)
+        for heathen in heathens:
+            self.add(heathen)
+
+    def add(self, entity: Occupant, owner: typing.Optional[Player] = None):
+        """
+        Add the given entity to the grid at its current location.
+        :param entity: The unit, heathen, or settlement to add.
+        :param owner: The player that the unit or settlement belongs to. Not supplied for heathens.
+        """
+        occupants = self.occupants.setdefault(entity.location, [])
+        occupants.append(entity)
+        # The entities on each quad are kept in the order they were created in, rather than the order they arrived in,
+        # so that the grid for a loaded game, which is rebuilt from scratch, is identical to the original's.
+        if len(occupants) > 1:
+            occupants.sort(key=lambda occupant: occupant.entity_id)
+        if owner is not None:
+            self.owners[entity.entity_id] = owner
+        self.increment_version(owner)
+
+    def remove(self, entity: Occupant):
+        """
+        Remove the given entity from the grid.
+        :param entity: The unit, heathen, or settlement to remove.
+        """
+        loc = entity.location
+        if loc in self.occupants:
+            occupants = self.occupants[loc]
+            if entity in occupants:
+                occupants.remove(entity)
+            if len(occupants) == 0:
+                self.occupants.pop(loc)
+        self.increment_version(self.owners.pop(entity.entity_id, None))
+
+    def move(self, entity: Occupant, location: typing.Tuple[int, int]):
+        """
+        Move the given entity to a new location, updating the grid.
+        :param entity: The unit or heathen to move.
+        :param location: The location to move the entity to.
+        """
+        # Moving doesn't change the entity's owner.
+        owner = self.owner_of(entity)
+        self.remove(entity)
+        entity.location = location
+        self.add(entity, owner)
+
+    def set_owner(self, entity: typing.Union[Unit, Settlement], owner: Player):
+        """
+        Change the owner of the given unit or settlement, e.g. when a settlement is captured.
+        :param entity: The unit or settlement that has changed hands.
+        :param owner: The player that now owns the entity.
+        """
+        self.increment_version(self.owners.get(entity.entity_id))
+        self.owners[entity.entity_id] = owner
+        self.increment_version(owner)
+
+    def increment_version(self, owner: typing.Optional[Player]):
+        """
+        Record a change to one of the given owner's entities.
+        :param owner: The player whose entity has changed, or None if it is a heathen.
+        """
+        key = None if owner is None else owner.entity_id
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def version_of(self, owner: typing.Optional[Player]) -> int:
+        """
+        Get the version of the given owner's entities.
+        :param owner: The player to get the version for, or None for the heathens.
+        :return: The number of changes there have been to the owner's entities.
+        """
+        return self.versions.get(None if owner is None else owner.entity_id, 0)
+
+    def owner_of(self, entity: Occupant) -> typing.Optional[Player]:
+        """
+        Get the owner of the given entity.
+        :param entity: The unit, heathen, or settlement to get the owner of.
+        :return: The player that owns the entity, or None if it is a heathen, a garrisoned unit, or no longer exists.
+        """
+        return self.owners.get(entity.entity_id)
+
+    def at(self, location: typing.Tuple[int, int]) -> typing.List[Occupant]:
+        """
+        Get the entities at the given location.
+        :param location: The location to check.
+        :return: The units, heathens, and settlements at the location. Must not be modified by the caller.
+        """
+        return self.occupants.get(location, [])
+
+    def within(self, location: typing.Tuple[int, int], radius: int) -> typing.List[Occupant]:
+        """
+        Get the entities within the given Chebyshev distance of a location, i.e. within a square of side 2r + 1 centred
+        on the location.
+        :param location: The centre of the search.
+        :param radius: The maximum distance, in quads, from the location in either direction.
+        :return: The units, heathens, and settlements within the radius, ordered by row and then column.
+        """
+        # For large radii, it's cheaper to check each occupied quad than each quad in the square. The occupied quads are
+        # in the order they last became occupied, so the entities found are then sorted, so that the order doesn't
+        # depend on the game's history, which a loaded game doesn't have.
+        if (2 * radius + 1) ** 2 > len(self.occupants):
+            found = [occupant for loc, occupants in self.occupants.items()
+                     if max(abs(loc[0] - location[0]), abs(loc[1] - location[1])) <= radius
+                     for occupant in occupants]
+            found.sort(key=lambda occupant: (occupant.location[1], occupant.location[0]))
+            return found
+        found = []
+        for y in range(location[1] - radius, location[1] + radius + 1):
+            for x in range(location[0] - radius, location[0] + radius + 1):
+                if (x, y) in self.occupants:
+                    found.extend(self.occupants[(x, y)])
+        return found
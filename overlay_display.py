@@ -8,15 +8,16 @@ from catalogue import get_all_unlockable, get_unlockable_improvements, get_unloc
 from models import VictoryType, InvestigationResult, Heathen, EconomicStatus, ImprovementType, OverlayType, \
     SettlementAttackType, PauseOption, Faction, HarvestStatus, ConstructionMenu, ProjectType, Project
 from overlay import Overlay
+from profiler import PROFILER, FRAME_PHASE, get_bucket_labels
 
 
+@PROFILER.timed("display_overlay")
 def display_overlay(overlay: Overlay, is_night: bool):
     """
     Display the given overlay to the screen.
     :param overlay The Overlay to display.
     :param is_night Whether it is night.
     """
-    pyxel.load("resources/sprites.pyxres")
     # The victory overlay displays the player who achieved the victory, as well as the type.
     if OverlayType.VICTORY in overlay.showing:
         pyxel.rectb(12, 60, 176, 38, pyxel.COLOR_WHITE)
@@ -465,7 +466,6 @@ def display_overlay(overlay: Overlay, is_night: bool):
         # The standard overlay displays the current turn, ongoing blessing, player wealth, and player settlement
         # statistics.
         if OverlayType.STANDARD in overlay.showing:
-            pyxel.load("resources/sprites.pyxres")
             pyxel.rectb(20, 20, 160, 144, pyxel.COLOR_WHITE)
             pyxel.rect(21, 21, 158, 142, pyxel.COLOR_BLACK)
             pyxel.text(90, 30, f"Turn {overlay.current_turn}", pyxel.COLOR_WHITE)
@@ -690,4 +690,31 @@ def display_overlay(overlay: Overlay, is_night: bool):
             pyxel.text(83, 115, "Next song", pyxel.COLOR_WHITE)
             pyxel.text(23, 125, "B", pyxel.COLOR_WHITE)
             pyxel.text(83, 125, "Buyout construction", pyxel.COLOR_WHITE)
+            pyxel.text(23, 135, "F3", pyxel.COLOR_WHITE)
+            pyxel.text(83, 135, "Show performance stats", pyxel.COLOR_WHITE)
             pyxel.text(54, 150, "Press SPACE to go back.", pyxel.COLOR_WHITE)
+
+
+def display_profiler():
+    """
+    Display the profiling HUD, which shows a histogram of the most recent frame times, and the average time recently
+    taken by each phase of the game.
+    """
+    histogram = PROFILER.get_recent_histogram()
+    phases = [(phase, timings) for phase, timings in PROFILER.phases.items() if phase != FRAME_PHASE]
+    pyxel.rectb(98, 6, 98, 22 + 7 * (len(histogram) + len(phases)), pyxel.COLOR_WHITE)
+    pyxel.rect(99, 7, 96, 20 + 7 * (len(histogram) + len(phases)), pyxel.COLOR_BLACK)
+    pyxel.text(102, 9, "Frame times", pyxel.COLOR_WHITE)
+    # Each bar is scaled relative to the most common frame time.
+    most_frames = max(max(histogram), 1)
+    for idx, (label, count) in enumerate(zip(get_bucket_labels(), histogram)):
+        pyxel.text(102, 16 + idx * 7, label, pyxel.COLOR_WHITE)
+        # The first two buckets are frames that kept up with 60 and 30 FPS respectively.
+        bar_colour = pyxel.COLOR_GREEN if idx == 0 else pyxel.COLOR_YELLOW if idx == 1 else pyxel.COLOR_RED
+        pyxel.rect(130, 16 + idx * 7, round(60 * count / most_frames), 5, bar_colour)
+    phases_y = 18 + 7 * len(histogram)
+    pyxel.text(102, phases_y, "Phase times (ms)", pyxel.COLOR_WHITE)
+    for idx, (phase, timings) in enumerate(phases):
+        pyxel.text(102, phases_y + 7 + idx * 7, phase, pyxel.COLOR_GRAY)
+        mean_duration = sum(timings.recent) / len(timings.recent)
+        pyxel.text(172, phases_y + 7 + idx * 7, f"{mean_duration * 1000:.1f}", pyxel.COLOR_WHITE)
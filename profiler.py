@@ -0,0 +1,120 @@
+import csv
+import functools
+import time
+import typing
+
+from models import PhaseTimings
+
+# The name that the time between each frame is recorded under.
+FRAME_PHASE = "frame"
+# The upper bound, in milliseconds, of each bucket of the frame time histogram. Frames that take longer than the last
+# bound are counted in one final bucket.
+FRAME_BUCKETS = [17, 33, 50, 100]
+
+
+class Profiler:
+    """
+    Records how long each phase of the game takes, i.e. each frame, each update and draw, and each phase of a turn, so
+    that slowdowns can be traced back to the phase responsible. Timings are always recorded, as doing so is cheap. They
+    can be viewed in-game with the profiling HUD, and are written to a CSV file when the game is exited.
+    """
+
+    def __init__(self):
+        """
+        Initialise the profiler with no timings recorded.
+        """
+        self.phases: typing.Dict[str, PhaseTimings] = {}
+        # The number of frames in each bucket of the frame time histogram, over the whole session.
+        self.frame_histogram: typing.List[int] = [0] * (len(FRAME_BUCKETS) + 1)
+
+    def record(self, phase: str, duration: float):
+        """
+        Record a single call of the given phase.
+        :param phase: The name of the phase, e.g. "end_turn".
+        :param duration: How long the call took, in seconds.
+        """
+        if phase not in self.phases:
+            self.phases[phase] = PhaseTimings()
+        timings = self.phases[phase]
+        timings.calls += 1
+        timings.total += duration
+        timings.longest = max(timings.longest, duration)
+        timings.recent.append(duration)
+
+    def record_frame(self, duration: float):
+        """
+        Record the time between two frames.
+        :param duration: The time since the previous frame, in seconds.
+        """
+        self.record(FRAME_PHASE, duration)
+        self.frame_histogram[get_frame_bucket(duration)] += 1
+
+    def timed(self, phase: str) -> typing.Callable[[typing.Callable], typing.Callable]:
+        """
+        Build a decorator that records each call of the decorated function as a call of the given phase.
+        :param phase: The name of the phase.
+        :return: The decorator.
+        """
+
+        def decorator(func: typing.Callable) -> typing.Callable:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(phase, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorator
+
+    def get_recent_histogram(self) -> typing.List[int]:
+        """
+        Get the frame time histogram for just the most recent frames, for display on the HUD.
+        :return: The number of recent frames in each bucket.
+        """
+        histogram = [0] * (len(FRAME_BUCKETS) + 1)
+        if FRAME_PHASE in self.phases:
+            for duration in self.phases[FRAME_PHASE].recent:
+                histogram[get_frame_bucket(duration)] += 1
+        return histogram
+
+    def write_csv(self, path: str):
+        """
+        Write every phase's timings for the session, followed by the frame time histogram, to a CSV file.
+        :param path: The path of the file to write.
+        """
+        with open(path, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["phase", "calls", "total_ms", "mean_ms", "max_ms"])
+            for phase, timings in self.phases.items():
+                writer.writerow([phase, timings.calls, f"{timings.total * 1000:.3f}",
+                                 f"{timings.total * 1000 / timings.calls:.3f}", f"{timings.longest * 1000:.3f}"])
+            # Each bucket of the histogram is written as its own row, with the number of frames as the calls.
+            for label, count in zip(get_bucket_labels(), self.frame_histogram):
+                writer.writerow([f"{FRAME_PHASE} {label}", count, "", "", ""])
+
+
+def get_frame_bucket(duration: float) -> int:
+    """
+    Get the bucket of the frame time histogram that the given frame time belongs in.
+    :param duration: The frame time, in seconds.
+    :return: The index of the bucket.
+    """
+    milliseconds = duration * 1000
+    return next((idx for idx, bound in enumerate(FRAME_BUCKETS) if milliseconds < bound), len(FRAME_BUCKETS))
+
+
+def get_bucket_labels() -> typing.List[str]:
+    """
+    Get a label for each bucket of the frame time histogram, e.g. "<17ms" or "17-33ms".
+    :return: The labels, in bucket order.
+    """
+    return [f"<{FRAME_BUCKETS[0]}ms"] + \
+        [f"{lower}-{upper}ms" for lower, upper in zip(FRAME_BUCKETS, FRAME_BUCKETS[1:])] + \
+        [f"{FRAME_BUCKETS[-1]}ms+"]
+
+
+# The profiler shared by the game and the simulation, so that phases can be timed wherever they are called from.
+PROFILER = Profiler()
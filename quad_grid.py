@@ -0,0 +1,100 @@
+import typing
+
+import numpy as np
+
+from models import Biome, Quad, BIOMES
+
+
+class QuadRow:
+    """
+    A single row of a QuadGrid, so that quads can continue to be accessed with quads[y][x].
+    """
+    __slots__ = ("grid", "y")
+
+    def __init__(self, grid: "QuadGrid", y: int):
+        """
+        Initialise the row.
+        :param grid: The grid the row belongs to.
+        :param y: The index of the row.
+        """
+        self.grid = grid
+        self.y = y
+
+    def __getitem__(self, x: int) -> Quad:
+        """
+        Get the quad in the given column of this row.
+        :param x: The column of the quad.
+        :return: A view onto the quad.
+        """
+        return Quad(self.grid, x, self.y)
+
+    def __len__(self) -> int:
+        return self.grid.width
+
+    def __iter__(self) -> typing.Iterator[Quad]:
+        return (Quad(self.grid, x, self.y) for x in range(self.grid.width))
+
+
+class QuadGrid:
+    """
+    The quads that make up the board, stored as a set of arrays rather than as one object per quad. This takes up a
+    fraction of the memory, and allows for map-wide queries to be made on whole arrays at once. Individual quads are
+    accessed as lightweight Quad views with quads[y][x], just as they were when quads were stored in a 2D list.
+    """
+
+    def __init__(self, width: int = 100, height: int = 90):
+        """
+        Initialise an empty grid of the given size. All quads begin as deserts with no yield.
+        :param width: The number of quads in each row.
+        :param height: The number of rows.
+        """
+        self.width = width
+        self.height = height
+        # The index of each quad's biome in BIOMES.
+        self.biomes: np.ndarray = np.zeros((height, width), dtype=np.uint8)
+        # The wealth, harvest, zeal, and fortune of each quad, in that order.
+        self.yields: np.ndarray = np.zeros((height, width, 4), dtype=np.float32)
+        self.relics: np.ndarray = np.zeros((height, width), dtype=bool)
+        self.selected: np.ndarray = np.zeros((height, width), dtype=bool)
+        # The relics as they were when the grid was generated. Relics are the only part of a generated grid that
+        # changes, so this allows saves to store just the relics that have since been investigated. Grids that were
+        # not generated from the game's seed, e.g. those loaded from older saves, don't have this.
+        self.generated_relics: typing.Optional[np.ndarray] = None
+
+    def __getitem__(self, y: int) -> QuadRow:
+        """
+        Get the given row of quads.
+        :param y: The index of the row.
+        :return: The row, which can in turn be indexed by column.
+        """
+        return QuadRow(self, y)
+
+    def __len__(self) -> int:
+        return self.height
+
+    def __iter__(self) -> typing.Iterator[QuadRow]:
+        return (QuadRow(self, y) for y in range(self.height))
+
+    def set_quad(self, x: int, y: int, biome: Biome, quad_yield: (float, float, float, float), is_relic: bool = False):
+        """
+        Set the contents of the quad at the given location.
+        :param x: The column of the quad.
+        :param y: The row of the quad.
+        :param biome: The biome of the quad.
+        :param quad_yield: The wealth, harvest, zeal, and fortune of the quad.
+        :param is_relic: Whether the quad contains a relic.
+        """
+        self.biomes[y, x] = BIOMES.index(biome)
+        self.yields[y, x] = quad_yield
+        self.relics[y, x] = is_relic
+
+    def relics_within(self, location: (int, int), radius: int) -> typing.List[typing.Tuple[int, int]]:
+        """
+        Find the relics within the given Chebyshev distance of a location.
+        :param location: The centre of the search.
+        :param radius: The maximum distance, in quads, from the location in either direction.
+        :return: The (x, y) locations of the relics found, ordered by row and then column.
+        """
+        min_x, min_y = max(location[0] - radius, 0), max(location[1] - radius, 0)
+        window = self.relics[min_y:max(location[1] + radius + 1, 0), min_x:max(location[0] + radius + 1, 0)]
+        return [(min_x + int(x), min_y + int(y)) for y, x in np.argwhere(window)]
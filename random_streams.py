@@ -0,0 +1,36 @@
+import random
+
+
+class RandomStreams:
+    """
+    The separate random number generators used for each source of randomness in a game. Every generator is derived from
+    the game's seed, so that the same seed always produces the same game, and so that, for example, an extra relic
+    investigation does not change how the heathens move.
+    Note that combat has no stream of its own, as attacks are entirely deterministic.
+    """
+
+    def __init__(self, seed: int, turn: int = 1):
+        """
+        Initialise the streams for the given seed and turn.
+        :param seed: The game's seed.
+        :param turn: The game's current turn. Will be greater than 1 when loading a game.
+        """
+        self.seed = seed
+        # The map, the game setup, and the player's initial view of the map are only generated once, so their streams
+        # are derived from the seed alone.
+        self.map_gen = random.Random(f"{seed}-map")
+        self.setup = random.Random(f"{seed}-setup")
+        self.view = random.Random(f"{seed}-view")
+        self.set_turn(turn)
+
+    def set_turn(self, turn: int):
+        """
+        Reseed the per-turn streams for the given turn. Because these streams depend only on the seed and the turn, a
+        game loaded part-way through plays out its subsequent turns exactly as it would have had it never been saved.
+        :param turn: The turn that is beginning.
+        """
+        self.ai = random.Random(f"{self.seed}-ai-{turn}")
+        self.heathens = random.Random(f"{self.seed}-heathens-{turn}")
+        self.relics = random.Random(f"{self.seed}-relics-{turn}")
+        self.climate = random.Random(f"{self.seed}-climate-{turn}")
+        self.names = random.Random(f"{self.seed}-names-{turn}")
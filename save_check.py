@@ -0,0 +1,124 @@
+import argparse
+import io
+import itertools
+import json
+import os
+import sys
+import tempfile
+import typing
+
+from autosaver import write_save_atomically
+from benchmark import build_state
+from save_encoder import SaveEncoder
+from simulation import Simulation, load_simulation
+
+# The turn that each game is saved and loaded on, and the turn that the original and loaded games are played on to.
+SAVE_TURN = 80
+END_TURN = 140
+# The seeds of the games checked by default.
+DEFAULT_SEEDS = [3, 4, 5]
+# The formats that games are saved in for the check.
+SAVE_FORMATS = ["binary", "json"]
+
+
+def normalise_state(data: typing.Any) -> typing.Any:
+    """
+    Normalise the given saved state so that it can be compared with that of another game. Entity IDs are removed, as
+    they are drawn from a counter shared by every game in the process, so the entities created after a load are given
+    different IDs to those in the original game. Numbers are all made floats, as binary saves store units' statistics
+    as floats where they may have been integers.
+    :param data: The saved state, as parsed from JSON.
+    :return: The normalised state.
+    """
+    if isinstance(data, dict):
+        if data.keys() == {"id"}:
+            return None
+        return {key: normalise_state(value) for key, value in data.items() if key != "entity_id"}
+    if isinstance(data, list):
+        return [normalise_state(item) for item in data]
+    if isinstance(data, int) and not isinstance(data, bool):
+        return float(data)
+    return data
+
+
+def get_fingerprint(sim: Simulation) -> str:
+    """
+    Get a fingerprint of the given game's state, for comparison with other games.
+    :param sim: The game to get the fingerprint of.
+    :return: The game's normalised saved state, as a JSON string.
+    """
+    state = json.loads(json.dumps(sim.get_save_state(), cls=SaveEncoder))
+    return json.dumps(normalise_state(state), sort_keys=True)
+
+
+def save_and_load(sim: Simulation, save_format: str, save_path: str) -> Simulation:
+    """
+    Save the given game in the given format, and then load it back in.
+    :param sim: The game to save.
+    :param save_format: The format to save the game in, either "binary" or "json".
+    :param save_path: The path to write binary saves to. JSON saves are kept in memory, as the game no longer writes
+    them.
+    :return: The loaded game.
+    """
+    if save_format == "binary":
+        write_save_atomically(save_path, sim.quads, sim.get_save_state())
+        with open(save_path, "rb") as save_file:
+            return load_simulation(save_file)
+    # JSON saves, as written by older versions of the game, also contain every quad.
+    legacy_save = {"quads": list(itertools.chain.from_iterable(sim.quads)), **sim.get_save_state()}
+    return load_simulation(io.BytesIO(json.dumps(legacy_save, cls=SaveEncoder).encode()))
+
+
+def check_seed(seed: int, save_turn: int, end_turn: int, save_path: str) -> typing.Dict[str, typing.Optional[int]]:
+    """
+    Check that games loaded from saves continue exactly as the original game does.
+    :param seed: The seed of the AI-only game to check.
+    :param save_turn: The turn to save and load the game on.
+    :param end_turn: The turn to play the original and loaded games on to.
+    :param save_path: The path to write binary saves to.
+    :return: The first turn on which each loaded game differed from the original, keyed by save format, or None if
+    it never did.
+    """
+    original = build_state(seed, save_turn)
+    loaded_games = {save_format: save_and_load(original, save_format, save_path) for save_format in SAVE_FORMATS}
+    divergences: typing.Dict[str, typing.Optional[int]] = dict.fromkeys(SAVE_FORMATS)
+    while True:
+        fingerprint = get_fingerprint(original)
+        for save_format, loaded in loaded_games.items():
+            if divergences[save_format] is None and get_fingerprint(loaded) != fingerprint:
+                divergences[save_format] = original.turn
+        # Games that end early are compared up until their end.
+        if original.turn >= end_turn or not original.step():
+            break
+        for loaded in loaded_games.values():
+            loaded.step()
+    return divergences
+
+
+def main():
+    """
+    Check that saved games continue exactly as the originals do once loaded, for the seeds supplied as command-line
+    arguments. Exits with a non-zero status if any loaded game differs from its original.
+    """
+    parser = argparse.ArgumentParser(description="Check that Microcosm's saved games continue unchanged once loaded.")
+    parser.add_argument("--seeds", type=int, nargs="+", default=DEFAULT_SEEDS, help="The seeds of the games to check.")
+    parser.add_argument("--save-turn", type=int, default=SAVE_TURN, help="The turn to save and load each game on.")
+    parser.add_argument("--end-turn", type=int, default=END_TURN,
+                        help="The turn to play the original and loaded games on to.")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as saves_dir:
+        save_path = os.path.join(saves_dir, "check.sav")
+        for seed in args.seeds:
+            for save_format, divergence in check_seed(seed, args.save_turn, args.end_turn, save_path).items():
+                if divergence is None:
+                    print(f"Seed {seed}, {save_format} save: matches the original up to turn {args.end_turn}.")
+                else:
+                    print(f"Seed {seed}, {save_format} save: differs from the original from turn {divergence}.")
+                    failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
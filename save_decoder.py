@@ -0,0 +1,211 @@
+import dataclasses
+import types
+import typing
+from enum import Enum
+
+from catalogue import get_improvement, get_project, get_blessing, get_unit_plan
+from models import Improvement, Project, Blessing, Unit, Heathen, Settlement, VisibilityMask, UnitPlan, Player, \
+    ENTITY_IDS
+from quad_grid import QuadGrid
+
+# A function that turns data parsed from a save file into a game object.
+Decoder = typing.Callable[[typing.Any], typing.Any]
+
+# The types that are always taken from the catalogue, rather than being built from the saved data. These are looked up
+# by name, so that loaded games share the catalogue's objects, just as new games do.
+CATALOGUE_LOOKUPS: typing.Dict[type, typing.Callable[[str], typing.Any]] = {
+    Improvement: get_improvement,
+    Project: get_project,
+    Blessing: get_blessing
+}
+# The types that have IDs, and can therefore be referred to by other objects in saves.
+ENTITY_TYPES = (Unit, Heathen, Settlement, Player)
+
+
+class SaveDecoder:
+    """
+    Builds game objects directly from the data parsed from a save file, in a single pass. The types declared on each
+    data class's fields act as the schema for the save: a decoder function is built once for each type, and then used
+    for every object of that type. Both JSON and binary saves are decoded this way.
+    """
+
+    def __init__(self, quads: typing.Optional[QuadGrid] = None,
+                 units: typing.Optional[typing.List[Unit | Heathen]] = None):
+        """
+        Initialise the decoder.
+        :param quads: The loaded quads, which settlements will be pointed to. Only required when decoding settlements or
+        players.
+        :param units: The units and heathens read from a binary save's records, which the rest of the save refers to
+        by index. JSON saves contain their units in full, so don't need these.
+        """
+        self.quads = quads
+        self.units = units if units is not None else []
+        self.decoders: typing.Dict[typing.Any, Decoder] = {}
+        # Every entity decoded so far, keyed by ID.
+        self.entities: typing.Dict[int, typing.Any] = {}
+        # The reference fields that have been decoded, as the object they belong to, the field's name and type, and the
+        # saved reference. These can only be resolved once every entity has been decoded.
+        self.references: typing.List[typing.Tuple[typing.Any, str, type, typing.Any]] = []
+
+    def decode(self, data: typing.Any, hint: typing.Any) -> typing.Any:
+        """
+        Decode the given parsed data into an object of the given type.
+        :param data: The data parsed from the save file.
+        :param hint: The type to decode the data into, e.g. typing.List[Player].
+        :return: The decoded object.
+        """
+        return self.get_decoder(hint)(data)
+
+    def get_decoder(self, hint: typing.Any) -> Decoder:
+        """
+        Get the decoder function for the given type, building it if this is the first time it has been needed.
+        :param hint: The type to get the decoder for, as declared on a data class field.
+        :return: The decoder function.
+        """
+        if hint not in self.decoders:
+            self.decoders[hint] = self.build_decoder(hint)
+        return self.decoders[hint]
+
+    def build_decoder(self, hint: typing.Any) -> Decoder:
+        """
+        Build the decoder function for the given type.
+        :param hint: The type to build the decoder for, as declared on a data class field.
+        :return: The decoder function.
+        """
+        origin = typing.get_origin(hint)
+        if origin is typing.Union or origin is types.UnionType:
+            options = [option for option in typing.get_args(hint) if option is not type(None)]
+            # The only field with more than one type is a construction's.
+            decode_option = self.get_decoder(options[0]) if len(options) == 1 else self.decode_construction
+            return lambda data: None if data is None else decode_option(data)
+        if origin is list:
+            decode_item = self.get_decoder(typing.get_args(hint)[0])
+            return lambda data: [decode_item(item) for item in data]
+        if origin is set:
+            decode_item = self.get_decoder(typing.get_args(hint)[0])
+            return lambda data: {decode_item(item) for item in data}
+        # Locations are declared as tuples of types, e.g. (int, int), and are saved as lists.
+        if isinstance(hint, tuple):
+            return tuple
+        if hint in CATALOGUE_LOOKUPS:
+            lookup = CATALOGUE_LOOKUPS[hint]
+            return lambda data: lookup(data["name"])
+        if hint in (Unit, Heathen):
+            # Binary saves refer to their units and heathens by index, where JSON saves contain them in full.
+            decode_unit = self.build_dataclass_decoder(hint)
+            return lambda data: self.register_entity(self.units[data]) if isinstance(data, int) else decode_unit(data)
+        if hint is VisibilityMask:
+            return self.decode_visibility_mask
+        if isinstance(hint, type) and issubclass(hint, Enum):
+            return hint
+        if dataclasses.is_dataclass(hint):
+            return self.build_dataclass_decoder(hint)
+        # Everything else, i.e. numbers, strings, and booleans, can be used as-is.
+        return lambda data: data
+
+    def build_dataclass_decoder(self, cls: type) -> Decoder:
+        """
+        Build the decoder function for the given data class.
+        :param cls: The data class to build the decoder for.
+        :return: The decoder function.
+        """
+        # Transient fields are never saved, so they always take their default values. Reference fields are left for
+        # resolve_references() to fill in.
+        saved_fields = [fld for fld in dataclasses.fields(cls) if not fld.metadata.get("transient", False)]
+        field_decoders = [(fld.name, self.get_decoder(fld.type)) for fld in saved_fields
+                          if not fld.metadata.get("reference", False)]
+        reference_fields = [(fld.name, typing.get_args(fld.type)[0]) for fld in saved_fields
+                            if fld.metadata.get("reference", False)]
+        if cls is Settlement:
+            # Settlements only have the quad they are located on, so we can point them to the loaded one.
+            field_decoders = [(name, decoder) for name, decoder in field_decoders if name != "quads"]
+
+        def decode_dataclass(data: typing.Dict[str, typing.Any]) -> typing.Any:
+            # Fields missing from saves made by older versions of the game take their default values.
+            kwargs = {name: decoder(data[name]) for name, decoder in field_decoders if name in data}
+            if cls is Settlement:
+                kwargs["quads"] = [self.quads[kwargs["location"][1]][kwargs["location"][0]]]
+            obj = cls(**kwargs)
+            for name, referenced_type in reference_fields:
+                if data.get(name) is not None:
+                    self.references.append((obj, name, referenced_type, data[name]))
+            if cls is Player:
+                self.apply_faction_modifiers(obj)
+            if cls in ENTITY_TYPES:
+                self.register_entity(obj)
+            return obj
+
+        return decode_dataclass
+
+    def register_entity(self, entity: typing.Any) -> typing.Any:
+        """
+        Record a decoded entity so that references to it can be resolved, and make sure its ID is never reused.
+        :param entity: The unit, heathen, settlement, or player that has been decoded.
+        :return: The same entity.
+        """
+        self.entities[entity.entity_id] = entity
+        ENTITY_IDS.reserve(entity.entity_id)
+        return entity
+
+    def resolve_references(self):
+        """
+        Point each decoded reference field to the entity it refers to. Must be called once every entity has been
+        decoded.
+        """
+        for obj, name, referenced_type, data in self.references:
+            if isinstance(data, dict) and data.keys() == {"id"}:
+                setattr(obj, name, self.entities[data["id"]])
+            else:
+                # Older versions of the game saved a full copy of the entity instead, or in binary saves, a separate
+                # unit record. The copy is replaced by the decoded entity in the same place, if there is one.
+                copy = self.units[data] if isinstance(data, int) \
+                    else self.build_dataclass_decoder(referenced_type)(data)
+                setattr(obj, name, next((entity for entity in self.entities.values()
+                                         if entity is not copy and isinstance(entity, referenced_type) and
+                                         tuple(entity.location) == tuple(copy.location)), copy))
+        self.references = []
+
+    @staticmethod
+    def apply_faction_modifiers(player: Player):
+        """
+        Point the given player's blessings, and the unit plans being recruited in their settlements, to their faction's
+        versions in the catalogue. These are decoded by name into the unmodified versions, which would otherwise lose
+        the faction's modifiers, e.g. the Godless' increased blessing costs.
+        :param player: The decoded player, with their settlements.
+        """
+        player.blessings = [get_blessing(bls.name, player.faction) for bls in player.blessings]
+        if player.ongoing_blessing is not None:
+            player.ongoing_blessing.blessing = get_blessing(player.ongoing_blessing.blessing.name, player.faction)
+        for setl in player.settlements:
+            if setl.current_work is not None and isinstance(setl.current_work.construction, UnitPlan):
+                setl.current_work.construction = get_unit_plan(setl.current_work.construction.name, player.faction)
+
+    @staticmethod
+    def decode_construction(data: typing.Dict[str, typing.Any]) -> Improvement | Project | UnitPlan:
+        """
+        Decode the construction currently underway in a settlement.
+        :param data: The construction parsed from the save file.
+        :return: The Improvement, Project, or UnitPlan from the catalogue.
+        """
+        # We can tell which type the construction is from its fields. Improvements have an effect where projects do
+        # not, and projects have a type where unit plans do not.
+        if "effect" in data:
+            return get_improvement(data["name"])
+        if "type" in data:
+            return get_project(data["name"])
+        return get_unit_plan(data["name"])
+
+    def decode_visibility_mask(self, data: typing.Dict[str, typing.Any] | typing.List[typing.List[int]]) \
+            -> VisibilityMask:
+        """
+        Decode the quads seen by a player.
+        :param data: The packed mask, or a list of the locations seen, for saves made by older versions of the game.
+        :return: The decoded mask.
+        """
+        if isinstance(data, dict):
+            return VisibilityMask.unpack(data)
+        quads_seen = VisibilityMask(self.quads.width, self.quads.height)
+        for loc in data:
+            if 0 <= loc[0] < self.quads.width and 0 <= loc[1] < self.quads.height:
+                quads_seen.seen[loc[1], loc[0]] = True
+        return quads_seen
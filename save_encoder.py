@@ -1,6 +1,19 @@
 import dataclasses
+import typing
 from json import JSONEncoder
 
+from models import Quad, VisibilityMask
+
+
+def encode_reference(entity: typing.Any) -> typing.Optional[typing.Dict[str, int]]:
+    """
+    Encode a reference to an entity that is saved elsewhere, e.g. the unit besieging a settlement, which is saved with
+    the player it belongs to.
+    :param entity: The unit, heathen, settlement, or player being referred to, if there is one.
+    :return: The entity's ID, in a dictionary to distinguish it from the entities saved by older versions of the game.
+    """
+    return None if entity is None else {"id": entity.entity_id}
+
 
 class SaveEncoder(JSONEncoder):
     """
@@ -12,27 +25,21 @@ class SaveEncoder(JSONEncoder):
         :param o: The object to JSON-ify.
         :return: The JSON representation of the object.
         """
-        # Data classes have their own dictionary representations.
+        # Data classes are represented by a dictionary of their fields. We don't use dataclasses.asdict() here, as it
+        # deep-copies every field, which would include the entire quad grid for each settlement's quads. Any nested
+        # objects are encoded by subsequent calls to this method anyway.
         if dataclasses.is_dataclass(o):
-            return dataclasses.asdict(o)
+            return {field.name: encode_reference(getattr(o, field.name))
+                    if field.metadata.get("reference", False) else getattr(o, field.name)
+                    for field in dataclasses.fields(o) if not field.metadata.get("transient", False)}
+        # Quads are views onto the quad grid, so they need to be converted explicitly.
+        if isinstance(o, Quad):
+            return o.as_dict()
+        # The quads seen by a player are saved as a packed bitmap.
+        if isinstance(o, VisibilityMask):
+            return o.pack()
         # Sets must be represented as lists, no real difference anyway.
         if isinstance(o, set):
             return list(o)
-        # ObjectConvertors, which are defined below, are essentially dicts with attributes anyway, so just return their
-        # dict.
-        if isinstance(o, ObjectConverter):
-            return o.__dict__
         # Otherwise, let the standard JSONEncoder handle it.
         return super().default(o)
-
-
-class ObjectConverter:
-    """
-    A convenience class that allows attribute access to dictionary objects.
-    """
-    def __init__(self, dictionary):
-        """
-        Initialises the object.
-        :param dictionary: The dictionary to use to populate attributes.
-        """
-        self.__dict__.update(dictionary)
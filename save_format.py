@@ -0,0 +1,335 @@
+import dataclasses
+import json
+import struct
+import typing
+import zlib
+from enum import Enum
+
+import numpy as np
+
+from calculator import generate_quads, MAP_GENERATOR_VERSION
+from catalogue import get_blessing
+from models import Unit, Heathen, UnitPlan, Quad, ENTITY_IDS
+from quad_grid import QuadGrid
+from random_streams import RandomStreams
+from save_encoder import SaveEncoder
+
+# The bytes that every binary save begins with, used to tell binary saves apart from JSON ones.
+BINARY_MAGIC = b"MCSV"
+# The version of the binary format written by this version of the game. This must be incremented whenever the layout
+# below changes, so that saves in older layouts can be told apart, and read if they are to be supported.
+BINARY_VERSION = 1
+# The file extension given to binary saves.
+BINARY_EXTENSION = ".sav"
+# The extension given to saves and the saves index while they are being written. Files with this extension are never
+# listed as saves.
+TEMP_EXTENSION = ".tmp"
+
+# The magic bytes and format version.
+HEADER = struct.Struct("<4sH")
+# The width and height of the quad grid.
+GRID_HEADER = struct.Struct("<HH")
+# How the quad grid is stored, either in full or as changes to the grid generated from the game's seed.
+MAP_STORAGE = struct.Struct("<B")
+MAP_FULL = 0
+MAP_SEEDED = 1
+# The version of the map generation that a seeded quad grid was generated with, and the checksum of its biomes and
+# yields.
+SEEDED_MAP_HEADER = struct.Struct("<HI")
+# The number of unit records or locations that follow.
+COUNT = struct.Struct("<I")
+# The fixed layout of each unit and heathen record. In order: whether the record is for a heathen, the location, health,
+# remaining stamina, whether the unit is garrisoned, has attacked, or is sieging, and then the unit's plan. The plan's
+# name and prerequisite are indices into the save's string table, with -1 representing no prerequisite. Last is the
+# unit's ID.
+UNIT_RECORD = struct.Struct("<?hhdh???ddhd?hhI")
+# The amount of encoded state that is gathered before being compressed and written, in characters. Encoding yields many
+# tiny chunks, so gathering them up keeps the number of writes down, while keeping the memory used by a save constant.
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+class SaveFormat(Enum):
+    """
+    The formats that a save file can be in.
+    """
+    JSON = "JSON"  # Used by older versions of the game.
+    BINARY = "BINARY"
+
+
+def detect_save_format(save_file: typing.BinaryIO) -> SaveFormat:
+    """
+    Determine the format of the given save file from its first few bytes. The file is returned to its start afterwards.
+    :param save_file: The save file, opened in binary mode.
+    :return: The format of the save file.
+    """
+    magic = save_file.read(len(BINARY_MAGIC))
+    save_file.seek(0)
+    return SaveFormat.BINARY if magic == BINARY_MAGIC else SaveFormat.JSON
+
+
+class BinarySaveEncoder(SaveEncoder):
+    """
+    The encoder used to encode the non-quad state in binary saves. Units and heathens are set aside to be written as
+    fixed-layout records, and are replaced by their index in the list of records. Quads are replaced by their location,
+    as the quad grid is written separately.
+    """
+    def __init__(self):
+        """
+        Initialise the encoder with no units or strings.
+        """
+        super().__init__()
+        self.units: typing.List[Unit | Heathen] = []
+        self.strings: typing.List[str] = []
+        self.string_indices: typing.Dict[str, int] = {}
+
+    def default(self, o):
+        """
+        Returns the JSON representation of the given object.
+        :param o: The object to JSON-ify.
+        :return: The JSON representation of the object.
+        """
+        if isinstance(o, (Unit, Heathen)):
+            self.units.append(o)
+            return len(self.units) - 1
+        if isinstance(o, Quad):
+            return [o.x, o.y]
+        return super().default(o)
+
+    def iterencode_items(self, o: typing.Any, depth: int = 4) -> typing.Iterator[str]:
+        """
+        Encode the given object in pieces, one for each item of its outermost dictionaries, lists, and data classes.
+        Unlike iterencode(), which yields every token separately and cannot use the C encoder, each piece is encoded in
+        one go, so this is both fast and bounded by the size of the largest item, e.g. a single settlement.
+        :param o: The object to encode.
+        :param depth: The number of levels of dictionaries and lists to split into pieces.
+        :return: An iterator over the pieces of the JSON representation of the object.
+        """
+        # Data classes are split up too, via the dictionary of fields that they are encoded as.
+        if depth > 0 and dataclasses.is_dataclass(o):
+            o = self.default(o)
+        if depth > 0 and isinstance(o, dict):
+            yield "{"
+            for idx, (key, value) in enumerate(o.items()):
+                yield f"{', ' if idx > 0 else ''}{json.dumps(key)}: "
+                yield from self.iterencode_items(value, depth - 1)
+            yield "}"
+        elif depth > 0 and isinstance(o, list):
+            yield "["
+            for idx, value in enumerate(o):
+                if idx > 0:
+                    yield ", "
+                yield from self.iterencode_items(value, depth - 1)
+            yield "]"
+        else:
+            yield self.encode(o)
+
+    def get_string_index(self, string: str) -> int:
+        """
+        Get the index of the given string in the string table, adding it if it isn't there already.
+        :param string: The string to look up.
+        :return: The index of the string.
+        """
+        if string not in self.string_indices:
+            self.string_indices[string] = len(self.strings)
+            self.strings.append(string)
+        return self.string_indices[string]
+
+    def pack_unit(self, unit: Unit | Heathen) -> bytes:
+        """
+        Pack the given unit or heathen into a fixed-layout record.
+        :param unit: The unit or heathen to pack.
+        :return: The packed record.
+        """
+        is_heathen = isinstance(unit, Heathen)
+        plan = unit.plan
+        return UNIT_RECORD.pack(is_heathen, unit.location[0], unit.location[1], unit.health, unit.remaining_stamina,
+                                not is_heathen and unit.garrisoned, unit.has_attacked,
+                                not is_heathen and unit.sieging,
+                                plan.power, plan.max_health, plan.total_stamina, plan.cost, plan.can_settle,
+                                self.get_string_index(plan.name),
+                                -1 if plan.prereq is None else self.get_string_index(plan.prereq.name),
+                                unit.entity_id)
+
+
+def get_map_checksum(quads: QuadGrid) -> int:
+    """
+    Get a checksum of the parts of the given grid that never change after it is generated, i.e. its biomes and yields.
+    :param quads: The grid to get the checksum for.
+    :return: The CRC-32 of the grid's biomes and yields.
+    """
+    # The checksum is calculated over each array in turn, to avoid copying them both into one buffer.
+    return zlib.crc32(np.ascontiguousarray(quads.yields, dtype="<f4"),
+                      zlib.crc32(np.ascontiguousarray(quads.biomes, dtype=np.uint8)))
+
+
+def pack_locations(mask: np.ndarray) -> bytes:
+    """
+    Pack the locations that are set in the given mask into a count followed by their coordinates.
+    :param mask: The boolean mask of locations to pack, indexed by row and then column.
+    :return: The packed locations.
+    """
+    locations = np.argwhere(mask).astype("<u2")
+    return COUNT.pack(len(locations)) + locations.tobytes()
+
+
+def unpack_locations(data: bytes, offset: int) -> (np.ndarray, int):
+    """
+    Unpack locations packed with pack_locations().
+    :param data: The data to unpack from.
+    :param offset: The offset at which the packed locations begin.
+    :return: A tuple containing the (row, column) locations, and the offset at which they end.
+    """
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    locations = np.frombuffer(data, dtype="<u2", count=count * 2, offset=offset).reshape(count, 2)
+    return locations, offset + count * 2 * 2
+
+
+def write_compressed_json(save_file: typing.BinaryIO, chunks: typing.Iterable[str]):
+    """
+    Compress the given chunks of JSON and write them to the save file as a single zlib stream, as they are produced.
+    :param save_file: The file to write to, opened in binary mode.
+    :param chunks: The chunks of JSON to write, e.g. from BinarySaveEncoder.iterencode_items().
+    """
+    compressor = zlib.compressobj()
+    pending: typing.List[str] = []
+    pending_size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size >= STREAM_CHUNK_SIZE:
+            save_file.write(compressor.compress("".join(pending).encode("utf-8")))
+            pending = []
+            pending_size = 0
+    save_file.write(compressor.compress("".join(pending).encode("utf-8")))
+    save_file.write(compressor.flush())
+
+
+def write_binary_save(save_file: typing.BinaryIO, quads: QuadGrid, state: typing.Dict[str, typing.Any]):
+    """
+    Write the given game state to a save file in the binary format. The file consists of a header, the quad grid, the
+    state as compressed JSON, the units and heathens as fixed-layout records, and finally the string table as compressed
+    JSON. Grids that were generated from the game's seed are stored as the relics that have changed since, as the rest
+    can be regenerated. Other grids are stored in full, as packed arrays. Each section is written as it is encoded, so
+    the whole save is never held in memory at once.
+    :param save_file: The file to write to, opened in binary mode.
+    :param quads: The quads of the game's board.
+    :param state: The remaining game state, i.e. the players, heathens, turn, config, and night status.
+    """
+    save_file.write(HEADER.pack(BINARY_MAGIC, BINARY_VERSION))
+    save_file.write(GRID_HEADER.pack(quads.width, quads.height))
+    if quads.generated_relics is not None:
+        # The generator version and a checksum are included so that we can tell if the grid would be regenerated
+        # differently when loading.
+        save_file.write(MAP_STORAGE.pack(MAP_SEEDED))
+        save_file.write(SEEDED_MAP_HEADER.pack(MAP_GENERATOR_VERSION, get_map_checksum(quads)))
+        save_file.write(pack_locations(quads.relics != quads.generated_relics))
+        save_file.write(pack_locations(quads.selected))
+    else:
+        # The grid's arrays are written directly, rather than being copied to bytes first.
+        save_file.write(MAP_STORAGE.pack(MAP_FULL))
+        save_file.write(np.ascontiguousarray(quads.biomes, dtype=np.uint8))
+        save_file.write(np.ascontiguousarray(quads.yields, dtype="<f4"))
+        save_file.write(np.packbits(quads.relics))
+        save_file.write(np.packbits(quads.selected))
+    encoder = BinarySaveEncoder()
+    # The units are gathered by the encoder as it goes, so their records can only be written once the state has been.
+    write_compressed_json(save_file, encoder.iterencode_items(state))
+    save_file.write(COUNT.pack(len(encoder.units)))
+    for unit in encoder.units:
+        save_file.write(encoder.pack_unit(unit))
+    # Similarly, the string table is only complete once the units have been packed.
+    write_compressed_json(save_file, encoder.iterencode_items(encoder.strings))
+
+
+def read_compressed_json(data: bytes, offset: int) -> (bytes, int):
+    """
+    Read JSON written with write_compressed_json().
+    :param data: The data to read from.
+    :param offset: The offset at which the compressed JSON begins.
+    :return: A tuple containing the decompressed JSON, and the offset at which the compressed JSON ends.
+    """
+    decompressor = zlib.decompressobj()
+    decompressed = decompressor.decompress(memoryview(data)[offset:])
+    if not decompressor.eof:
+        raise ValueError("Save file is truncated.")
+    return decompressed, len(data) - len(decompressor.unused_data)
+
+
+def read_binary_save(save_file: typing.BinaryIO) \
+        -> (QuadGrid, typing.List[Unit | Heathen], typing.Dict[str, typing.Any]):
+    """
+    Read a save file in the binary format. The returned state has the same structure as a parsed JSON save, other than
+    the quads, which are returned separately, and the units and heathens, which are replaced by their index in the
+    returned list of units. See save_decoder.SaveDecoder for how the state is turned back into game objects.
+    :param save_file: The file to read from, opened in binary mode.
+    :return: A tuple containing the quad grid, the units and heathens, and the remaining game state.
+    """
+    data = save_file.read()
+    magic, version = HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Not a binary save file.")
+    if version != BINARY_VERSION:
+        raise ValueError(f"Save file is version {version}, but only version {BINARY_VERSION} is supported.")
+    offset = HEADER.size
+
+    width, height = GRID_HEADER.unpack_from(data, offset)
+    offset += GRID_HEADER.size
+    map_storage, = MAP_STORAGE.unpack_from(data, offset)
+    offset += MAP_STORAGE.size
+    quads: typing.Optional[QuadGrid] = None
+    if map_storage == MAP_SEEDED:
+        # The grid can only be regenerated once the config has been read, so for now we just read the changes.
+        generator_version, checksum = SEEDED_MAP_HEADER.unpack_from(data, offset)
+        if generator_version != MAP_GENERATOR_VERSION:
+            raise ValueError(f"The save's map was generated by version {generator_version} of the map generator, but "
+                             f"only version {MAP_GENERATOR_VERSION} can regenerate it.")
+        relic_changes, offset = unpack_locations(data, offset + SEEDED_MAP_HEADER.size)
+        selected, offset = unpack_locations(data, offset)
+    elif map_storage == MAP_FULL:
+        quads = QuadGrid(width, height)
+        quads.biomes[:] = np.frombuffer(data, dtype=np.uint8, count=width * height,
+                                        offset=offset).reshape(height, width)
+        offset += width * height
+        quads.yields[:] = np.frombuffer(data, dtype="<f4", count=width * height * 4,
+                                        offset=offset).reshape(height, width, 4)
+        offset += width * height * 4 * 4
+        # Each bitmap is padded to a whole number of bytes.
+        bitmap_size = (width * height + 7) // 8
+        for bitmap in (quads.relics, quads.selected):
+            packed = np.frombuffer(data, dtype=np.uint8, count=bitmap_size, offset=offset)
+            bitmap[:] = np.unpackbits(packed, count=width * height).reshape(height, width).astype(bool)
+            offset += bitmap_size
+    else:
+        raise ValueError(f"Unknown map storage type {map_storage}.")
+
+    state_json, offset = read_compressed_json(data, offset)
+    state: typing.Dict[str, typing.Any] = json.loads(state_json)
+    unit_count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    records = [UNIT_RECORD.unpack_from(data, offset + idx * UNIT_RECORD.size) for idx in range(unit_count)]
+    offset += unit_count * UNIT_RECORD.size
+    strings_json, offset = read_compressed_json(data, offset)
+    strings: typing.List[str] = json.loads(strings_json)
+
+    if map_storage == MAP_SEEDED:
+        quads = generate_quads(state["cfg"]["biome_clustering"], RandomStreams(state["cfg"]["seed"]).map_gen,
+                               width, height)
+        # Maps are generated with NumPy's random generators, whose output may change between NumPy versions.
+        if get_map_checksum(quads) != checksum:
+            raise ValueError(f"The map could not be regenerated from the save's seed. The save may have been made with "
+                             f"a different version of NumPy to this one ({np.__version__}).")
+        quads.relics[relic_changes[:, 0], relic_changes[:, 1]] ^= True
+        quads.selected[selected[:, 0], selected[:, 1]] = True
+
+    units = []
+    for (is_heathen, x, y, health, remaining_stamina, garrisoned, has_attacked, sieging,
+         power, max_health, total_stamina, cost, can_settle, name_idx, prereq_idx, entity_id) in records:
+        plan = UnitPlan(power, max_health, total_stamina, strings[name_idx],
+                        None if prereq_idx == -1 else get_blessing(strings[prereq_idx]), cost, can_settle)
+        ENTITY_IDS.reserve(entity_id)
+        if is_heathen:
+            units.append(Heathen(health, remaining_stamina, (x, y), plan, has_attacked, entity_id))
+        else:
+            units.append(Unit(health, remaining_stamina, (x, y), garrisoned, plan, has_attacked, sieging, entity_id))
+    return quads, units, state
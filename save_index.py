@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+import typing
+
+from models import SaveMetadata
+from save_decoder import SaveDecoder
+from save_encoder import SaveEncoder
+from save_format import TEMP_EXTENSION
+
+# The name of the index file, which is stored alongside the saves themselves.
+INDEX_FILE_NAME = "index.json"
+# The version of the index file's layout. Indices of any other version are discarded and rebuilt as saves are made.
+INDEX_VERSION = 1
+
+
+def build_save_metadata(path: str, state: typing.Dict[str, typing.Any]) -> SaveMetadata:
+    """
+    Build the metadata for a save that has just been written.
+    :param path: The path of the save file.
+    :param state: The game state that was saved, i.e. the players, heathens, turn, config, and night status.
+    :return: The metadata for the save.
+    """
+    stat = os.stat(path)
+    # The human player is always the first player.
+    return SaveMetadata(os.path.basename(path), stat.st_size, stat.st_mtime, state["turn"],
+                        state["cfg"].player_faction, len(state["players"]),
+                        sorted(state["players"][0].imminent_victories, key=lambda victory: victory.value))
+
+
+class SaveIndex:
+    """
+    A sidecar index of the details of each save in the saves directory, so that the load game menu can display them
+    without having to read every save file. The index is updated whenever a save is written, and may be updated from
+    both the game and the autosaver's threads.
+    """
+
+    def __init__(self, saves_dir: str):
+        """
+        Initialise the index, reading any existing index file.
+        :param saves_dir: The directory that saves are written to, and that the index is stored in.
+        """
+        self.path = os.path.join(saves_dir, INDEX_FILE_NAME)
+        self.lock = threading.Lock()
+        self.entries: typing.Dict[str, SaveMetadata] = self.read()
+
+    def read(self) -> typing.Dict[str, SaveMetadata]:
+        """
+        Read the entries from the index file.
+        :return: The metadata for each indexed save, keyed by file name. Empty if there is no usable index file.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            # A missing or corrupted index just means that saves won't have their details shown until they are remade.
+            return {}
+        if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+            return {}
+        entries: typing.List[SaveMetadata] = SaveDecoder().decode(index["saves"], typing.List[SaveMetadata])
+        return {entry.file_name: entry for entry in entries}
+
+    def write(self):
+        """
+        Write the entries to the index file. Like saves, the index is written to a temporary file first, so that it is
+        never left half-written. Must be called with the lock held.
+        """
+        temp_path = self.path + TEMP_EXTENSION
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            index_file.write(SaveEncoder().encode({"version": INDEX_VERSION, "saves": list(self.entries.values())}))
+        os.replace(temp_path, self.path)
+
+    def record(self, path: str, state: typing.Dict[str, typing.Any]):
+        """
+        Record the details of a save that has just been written.
+        :param path: The path of the save file.
+        :param state: The game state that was saved, i.e. the players, heathens, turn, config, and night status.
+        """
+        metadata = build_save_metadata(path, state)
+        with self.lock:
+            self.entries[metadata.file_name] = metadata
+            self.write()
+
+    def remove(self, file_names: typing.List[str]):
+        """
+        Remove the entries for saves that have been deleted.
+        :param file_names: The file names of the deleted saves.
+        """
+        with self.lock:
+            if any(file_name in self.entries for file_name in file_names):
+                for file_name in file_names:
+                    self.entries.pop(file_name, None)
+                self.write()
+
+    def get_entries(self, file_names: typing.List[str]) -> typing.List[typing.Optional[SaveMetadata]]:
+        """
+        Get the details of each of the given saves. Only the sizes and modification times of the saves are checked, so
+        none of the save files themselves are read.
+        :param file_names: The file names of the saves to get the details of.
+        :return: The metadata for each save, in the same order, or None for saves that aren't indexed, e.g. those made
+        by older versions of the game, or those that have changed since they were indexed.
+        """
+        with self.lock:
+            entries = [self.entries.get(file_name) for file_name in file_names]
+        details = []
+        for file_name, entry in zip(file_names, entries):
+            if entry is not None:
+                stat = os.stat(os.path.join(os.path.dirname(self.path), file_name))
+                if stat.st_size != entry.size or stat.st_mtime != entry.modified:
+                    entry = None
+            details.append(entry)
+        return details
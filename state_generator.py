@@ -0,0 +1,146 @@
+import argparse
+import datetime
+import itertools
+import os
+import random
+from copy import deepcopy
+
+from autosaver import write_save_atomically
+from calculator import generate_quads, complete_construction
+from catalogue import get_available_blessings, get_available_improvements, get_available_unit_plans, get_heathen, \
+    FACTION_COLOURS
+from models import GameConfig, Faction, AIPlaystyle, AttackPlaystyle, ExpansionPlaystyle, Player, Settlement, Unit, \
+    VisibilityMask, Construction
+from save_format import BINARY_EXTENSION
+from random_streams import RandomStreams
+from save_index import SaveIndex
+from simulation import Simulation
+
+# The highest level that generated settlements can have. Settlements can reach level 10 in-game, but players with
+# enough of them achieve a GLUTTONY victory.
+MAX_SETTLEMENT_LEVEL = 9
+
+
+def generate_state(player_count: int, settlements_per_player: int, units_per_player: int, heathen_count: int,
+                   width: int = 100, height: int = 90, turn: int = 200, seed: int = 0,
+                   ai_only: bool = True) -> Simulation:
+    """
+    Generate a late-game state directly, without playing the game out, so that the game can be tested at scales that
+    would take hours to reach through play. Every player is given a random selection of their faction's blessings, and
+    their settlements and units are only given the improvements and unit plans that those blessings unlock. No player is
+    given anything that would immediately achieve a victory, so that the game can be played on from the state.
+    :param player_count: The number of players, each of which will have a different faction.
+    :param settlements_per_player: The number of settlements each player has.
+    :param units_per_player: The number of deployed units each player has.
+    :param heathen_count: The number of heathens roaming the map.
+    :param width: The width of the map.
+    :param height: The height of the map.
+    :param turn: The turn that the game is up to.
+    :param seed: The seed for the game. The same seed and sizes will always produce the same state.
+    :param ai_only: Whether the first player should also be an AI player, rather than one that can be played.
+    :return: The simulation of the generated game.
+    """
+    if not 1 <= player_count <= len(Faction):
+        raise ValueError(f"There must be between 1 and {len(Faction)} players, one for each faction.")
+    entity_count = player_count * (settlements_per_player + units_per_player) + heathen_count
+    if entity_count > width * height:
+        raise ValueError(f"{entity_count} settlements, units, and heathens cannot fit on a {width}x{height} map.")
+    rng = random.Random(seed)
+    factions = rng.sample(list(Faction), player_count)
+    # The map is generated from the game's seed as it would be in-game, so that binary saves can regenerate it.
+    sim = Simulation(GameConfig(player_count, factions[0], True, True, True, seed, width, height),
+                     generate_quads(True, RandomStreams(seed).map_gen, width, height))
+    sim.turn = turn
+    sim.rngs.set_turn(turn)
+    # Every settlement, unit, and heathen is given its own quad.
+    locations = iter((loc % width, loc // width) for loc in rng.sample(range(width * height), entity_count))
+
+    for idx, faction in enumerate(factions):
+        playstyle = None if idx == 0 and not ai_only else \
+            AIPlaystyle(rng.choice(list(AttackPlaystyle)), rng.choice(list(ExpansionPlaystyle)))
+        player = Player(f"NPC{idx}", faction, FACTION_COLOURS[faction], rng.uniform(0, 10000), [], [], [],
+                        VisibilityMask(width, height), set(), ai_playstyle=playstyle)
+        # The blessings for the pieces of ardour are left out, as undergoing all three achieves a SERENDIPITY victory.
+        available_blessings = [bls for bls in get_available_blessings(player) if "Piece of" not in bls.name]
+        player.blessings = rng.sample(available_blessings, rng.randint(0, len(available_blessings)))
+        for setl_loc in itertools.islice(locations, settlements_per_player):
+            player.settlements.append(generate_settlement(sim, player, setl_loc, rng))
+        # Settlers are only available in settlements above level 1, so the units are all non-settlers.
+        available_plans = get_available_unit_plans(player, 1)
+        for unit_loc in itertools.islice(locations, units_per_player):
+            plan = rng.choice(available_plans)
+            player.units.append(Unit(rng.uniform(1, plan.max_health), rng.randint(0, plan.total_stamina), unit_loc,
+                                     False, deepcopy(plan)))
+        for entity in player.settlements + player.units:
+            player.quads_seen.reveal(entity.location, 5)
+        sim.players.append(player)
+    sim.heathens = [get_heathen(heathen_loc, turn) for heathen_loc in itertools.islice(locations, heathen_count)]
+    sim.occupancy.rebuild(sim.players, sim.heathens)
+    return sim
+
+
+def generate_settlement(sim: Simulation, player: Player, location: (int, int), rng: random.Random) -> Settlement:
+    """
+    Generate a developed settlement for the given player.
+    :param sim: The simulation of the game being generated.
+    :param player: The player that will own the settlement.
+    :param location: The location of the settlement.
+    :param rng: The random number generator to generate the settlement with.
+    :return: The generated settlement.
+    """
+    quad = sim.quads[location[1]][location[0]]
+    setl = Settlement(sim.namer.get_settlement_name(quad.biome, rng), location, [], [quad], [])
+    match player.faction:
+        case Faction.CONCENTRATED:
+            setl.strength *= 2
+        case Faction.FRONTIERSMEN:
+            setl.satisfaction = 75
+        case Faction.IMPERIALS:
+            setl.strength /= 2
+            setl.max_strength /= 2
+    setl.level = rng.randint(1, MAX_SETTLEMENT_LEVEL)
+    setl.harvest_reserves = pow(setl.level - 1, 2) * 25
+    # Improvements and garrisoned units are completed as they would be in-game, so that their effects are applied.
+    # The Holy Sanctum is left out, as constructing it achieves a VIGOUR victory.
+    available_improvements = [imp for imp in get_available_improvements(player, setl) if imp.name != "Holy Sanctum"]
+    constructions = rng.sample(available_improvements, rng.randint(0, len(available_improvements)))
+    constructions.extend(rng.choices(get_available_unit_plans(player, 1), k=rng.randint(0, 2)))
+    for construction in constructions:
+        setl.current_work = Construction(construction)
+        complete_construction(setl, player)
+    return setl
+
+
+def main():
+    """
+    Generate a game state based on the supplied command-line arguments, and write it to a save file that can be loaded
+    in-game.
+    """
+    parser = argparse.ArgumentParser(description="Generate a late-game save of Microcosm for stress testing.")
+    parser.add_argument("--players", type=int, default=14, choices=range(1, len(Faction) + 1),
+                        metavar=f"[1-{len(Faction)}]", help="The number of players.")
+    parser.add_argument("--settlements", type=int, default=40, help="The number of settlements each player has.")
+    parser.add_argument("--units", type=int, default=100, help="The number of deployed units each player has.")
+    parser.add_argument("--heathens", type=int, default=1000, help="The number of heathens.")
+    parser.add_argument("--width", type=int, default=100, help="The width of the map.")
+    parser.add_argument("--height", type=int, default=90, help="The height of the map.")
+    parser.add_argument("--turn", type=int, default=200, help="The turn that the game is up to.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="The seed for the game. The same seed will always produce the same state.")
+    parser.add_argument("--saves-dir", default="saves", help="The directory to write the save to.")
+    args = parser.parse_args()
+
+    # The first player is left for the user to play as, so that the save can be loaded and played in-game.
+    sim = generate_state(args.players, args.settlements, args.units, args.heathens, args.width, args.height,
+                         args.turn, args.seed, ai_only=False)
+    # The ':' characters in the datestring must be replaced to conform with Windows files supported characters.
+    sanitised_timestamp = datetime.datetime.now().isoformat(timespec='seconds').replace(':', '.')
+    save_name = os.path.join(args.saves_dir, f"save-{sanitised_timestamp}{BINARY_EXTENSION}")
+    save = sim.get_save_state()
+    write_save_atomically(save_name, sim.quads, save)
+    SaveIndex(args.saves_dir).record(save_name, save)
+    print(f"Wrote {save_name}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import csv
+import functools
+import itertools
+import multiprocessing
+import random
+import statistics
+import time
+import typing
+from collections import Counter
+
+from catalogue import FACTION_COLOURS
+from models import GameConfig, Faction, AIPlaystyle, AttackPlaystyle, ExpansionPlaystyle, Player, TournamentResult, \
+    VisibilityMask
+from simulation import Simulation
+
+# Every combination of attack and expansion playstyle that an AI player can have.
+PLAYSTYLES: typing.List[AIPlaystyle] = \
+    [AIPlaystyle(att, exp) for att, exp in itertools.product(AttackPlaystyle, ExpansionPlaystyle)]
+# Every combination of the biome clustering, fog of war, and climatic effects flags.
+CONFIG_FLAGS: typing.List[typing.Tuple[bool, bool, bool]] = list(itertools.product([True, False], repeat=3))
+# The plan for a single game: its config, and the faction and playstyle of each of its players.
+GamePlan = typing.Tuple[GameConfig, typing.List[Faction], typing.List[AIPlaystyle]]
+
+
+def plan_games(game_count: int, player_count: int, seed: int = 0) -> typing.List[GamePlan]:
+    """
+    Plan out the given number of games, spreading factions, AI playstyles, and config flags across them.
+    :param game_count: The number of games to plan.
+    :param player_count: The number of players in each game.
+    :param seed: The seed for the tournament. Each game is seeded with this plus its index.
+    :return: A list of the config, factions, and playstyles to use for each game.
+    """
+    games = []
+    for idx in range(game_count):
+        game_seed = seed + idx
+        # The factions are drawn from a generator seeded with the game's seed, so that the same tournament plan is
+        # produced each time, while still pitting factions against a variety of opponents.
+        factions = random.Random(game_seed).sample(list(Faction), player_count)
+        # Each seat cycles through the playstyles, offset from one another so that they face different combinations.
+        playstyles = [PLAYSTYLES[(idx + seat) % len(PLAYSTYLES)] for seat in range(player_count)]
+        biome_clustering, fog_of_war, climatic_effects = CONFIG_FLAGS[idx % len(CONFIG_FLAGS)]
+        cfg = GameConfig(player_count, factions[0], biome_clustering, fog_of_war, climatic_effects, game_seed)
+        games.append((cfg, factions, playstyles))
+    return games
+
+
+def play_game(game: GamePlan, max_turns: int) -> TournamentResult:
+    """
+    Play out a full AI-only game, timing each turn.
+    :param game: The config, factions, and playstyles to use for the game.
+    :param max_turns: The turn at which to stop the game if no victory has been achieved.
+    :return: The result of the game.
+    """
+    cfg, factions, playstyles = game
+    sim = Simulation(cfg)
+    sim.players = [Player(f"NPC{idx}", faction, FACTION_COLOURS[faction], 0, [], [], [],
+                          VisibilityMask(cfg.map_width, cfg.map_height), set(), ai_playstyle=playstyle)
+                   for idx, (faction, playstyle) in enumerate(zip(factions, playstyles))]
+    sim.initialise_ais()
+
+    turn_times: typing.List[float] = []
+    while sim.turn < max_turns:
+        start = time.perf_counter()
+        continuing = sim.step()
+        turn_times.append(time.perf_counter() - start)
+        if not continuing:
+            break
+
+    victory = sim.victory
+    return TournamentResult(cfg, factions, playstyles,
+                            None if victory is None else victory.type,
+                            None if victory is None else victory.player.faction,
+                            sim.turn, turn_times)
+
+
+def run_tournament(game_count: int, player_count: int, max_turns: int,
+                   processes: typing.Optional[int] = None, seed: int = 0) -> typing.List[TournamentResult]:
+    """
+    Play out the given number of games concurrently, using a pool of worker processes.
+    :param game_count: The number of games to play.
+    :param player_count: The number of players in each game.
+    :param max_turns: The turn at which to stop each game if no victory has been achieved.
+    :param processes: The number of worker processes to use. Defaults to the number of CPUs.
+    :param seed: The seed for the tournament. The same seed will always produce the same results.
+    :return: The results of each game, in the order in which they were planned.
+    """
+    games = plan_games(game_count, player_count, seed)
+    with multiprocessing.Pool(processes) as pool:
+        # Games vary wildly in length, so we hand them out one at a time rather than in large chunks. The results are
+        # still collected in the order the games were planned, rather than the order they finish in, so that the same
+        # seed always produces the same results in the same order.
+        return list(pool.imap(functools.partial(play_game, max_turns=max_turns), games))
+
+
+def print_summary(results: typing.List[TournamentResult], elapsed: float):
+    """
+    Print the faction win rates, victory types, and timings for the given results.
+    :param results: The results of the tournament's games.
+    :param elapsed: The wall time taken by the whole tournament, in seconds.
+    """
+    appearances = Counter(faction for res in results for faction in res.factions)
+    wins = Counter(res.winner for res in results if res.winner is not None)
+    print(f"Played {len(results)} games in {elapsed:.1f}s.")
+    print(f"{'Faction':<20}{'Games':>8}{'Wins':>8}{'Win rate':>10}")
+    for faction in sorted(Faction, key=lambda f: wins[f] / max(appearances[f], 1), reverse=True):
+        win_rate = wins[faction] / appearances[faction] if appearances[faction] > 0 else 0
+        print(f"{faction.value:<20}{appearances[faction]:>8}{wins[faction]:>8}{win_rate:>10.1%}")
+    victory_types = Counter(res.victory_type.value if res.victory_type is not None else "NONE" for res in results)
+    print("Victory types: " + ", ".join(f"{vic} {count}" for vic, count in victory_types.most_common()))
+    all_turn_times = [turn_time for res in results for turn_time in res.turn_times]
+    if all_turn_times:
+        print(f"Mean turns per game: {statistics.mean(res.turns for res in results):.1f}, "
+              f"mean turn time: {statistics.mean(all_turn_times) * 1000:.2f}ms, "
+              f"slowest turn: {max(all_turn_times) * 1000:.2f}ms")
+
+
+def write_csv(results: typing.List[TournamentResult], path: str):
+    """
+    Write one row per game for the given results to a CSV file.
+    :param results: The results of the tournament's games.
+    :param path: The path of the CSV file to write.
+    """
+    with open(path, "w", encoding="utf-8", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["seed", "factions", "playstyles", "biome_clustering", "fog_of_war", "climatic_effects",
+                         "victory_type", "winner", "turns", "mean_turn_time", "max_turn_time"])
+        for res in results:
+            writer.writerow([
+                res.cfg.seed,
+                ";".join(faction.value for faction in res.factions),
+                ";".join(f"{ps.attacking.value}/{ps.expansion.value}" for ps in res.playstyles),
+                res.cfg.biome_clustering, res.cfg.fog_of_war, res.cfg.climatic_effects,
+                "" if res.victory_type is None else res.victory_type.value,
+                "" if res.winner is None else res.winner.value,
+                res.turns,
+                statistics.mean(res.turn_times) if res.turn_times else 0,
+                max(res.turn_times, default=0)
+            ])
+
+
+def main():
+    """
+    Run a tournament of AI-only games based on the supplied command-line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Play out AI-only games of Microcosm across all CPU cores.")
+    parser.add_argument("--games", type=int, default=100, help="The number of games to play.")
+    parser.add_argument("--players", type=int, default=4, choices=range(2, 15), metavar="[2-14]",
+                        help="The number of players in each game.")
+    parser.add_argument("--max-turns", type=int, default=500,
+                        help="The turn at which games without a victory are stopped.")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="The number of worker processes to use. Defaults to the number of CPUs.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="The seed for the tournament. The same seed will always produce the same results.")
+    parser.add_argument("--csv", default=None, help="A file to write per-game results to.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_tournament(args.games, args.players, args.max_turns, args.processes, args.seed)
+    print_summary(results, time.perf_counter() - start)
+    if args.csv is not None:
+        write_csv(results, args.csv)
+
+
+if __name__ == "__main__":
+    main()